@@ -0,0 +1,16 @@
+from pathlib import Path
+from typing import Any
+import joblib
+
+
+def hash_file(digest, path: Path):
+    with open(path, 'rb') as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+
+
+# write then rename, so an interrupted save never leaves a corrupt file
+def dump_atomically(value: Any, path: Path):
+    temp_path = path.with_name(path.name + '.tmp')
+    joblib.dump(value, temp_path)
+    temp_path.replace(path)
@@ -0,0 +1,101 @@
+from enum import Enum
+from typing import Dict, List
+
+import numpy as np
+
+from .segment import Segment
+from .morphology_service import MorphologyService
+from .morphology_snapshot import FIELD_NAMES, read_snapshot, save_snapshot, snapshot_features
+from ..orthography.location import Location
+from ..orthography.token import Token
+from ..lexicography.lemma_service import LemmaService
+from ..api.corpus_client import CorpusClient
+
+
+# Morphology backend holding each segment feature in a parallel integer array, for
+# vectorized feature extraction. Enum features are coded by value (0 for none) and
+# lemmas by their lemma service id (-1 for none). Tokens and segments are only
+# created when requested, and are then reused, so nodes can compare segments by
+# identity.
+class ColumnarMorphologyService(MorphologyService):
+
+    def __init__(self, client: CorpusClient, lemma_service: LemmaService):
+        self.columns: Dict[str, np.ndarray] = {}
+        self._tokens: Dict[int, Token] = {}
+        super().__init__(client, lemma_service)
+
+    @property
+    def token_count(self):
+        return len(self._locations)
+
+    def token(self, location: Location):
+        token_index = self._token_index(location)
+        token = self._tokens.get(token_index)
+        if token is None:
+            token = self._token(token_index)
+            self._tokens[token_index] = token
+        return token
+
+    # the token's segments, as a slice of the feature columns
+    def segment_range(self, location: Location):
+        token_index = self._token_index(location)
+        return (int(self._segment_starts[token_index]), int(self._segment_starts[token_index + 1]))
+
+    def _read_morphology(self, lemma_service: LemmaService):
+        state = read_snapshot(self.SNAPSHOT_FILE, self.MORPHOLOGY_FILE)
+        if state is None:
+            save_snapshot(self.SNAPSHOT_FILE, self.MORPHOLOGY_FILE, self._read_tsv(lemma_service))
+            state = read_snapshot(self.SNAPSHOT_FILE, self.MORPHOLOGY_FILE)
+
+        # feature columns, by looking up each segment's record in per-record codes
+        self._features = snapshot_features(state, lemma_service)
+        self._segment_features = state['segment_features']
+        for name in FIELD_NAMES:
+            codes = np.array(
+                [_code(lemma_service, name, getattr(features, name)) for features in self._features], dtype=np.int32)
+            self.columns[name] = codes[self._segment_features]
+
+        # offsets of each token's segments, each verse's tokens and each chapter's verses,
+        # each ending with the total count
+        self._locations = state['locations']
+        self._segment_starts = np.concatenate(([0], np.cumsum(state['segment_counts'], dtype=np.int64)))
+        verses = self._locations[:, 0].astype(np.int64) * 1000 + self._locations[:, 1]
+        verse_starts = np.flatnonzero(np.concatenate(([True], verses[1:] != verses[:-1])))
+        verse_chapters = self._locations[verse_starts, 0]
+        self._verse_token_starts = np.append(verse_starts, len(self._locations))
+        self._chapter_verse_starts = np.searchsorted(verse_chapters, np.arange(1, len(self._chapters) + 2))
+
+    def _token(self, token_index: int):
+        chapter_number, verse_number, token_number = self._locations[token_index].tolist()
+        token = Token(Location(chapter_number, verse_number, token_number))
+        start = int(self._segment_starts[token_index])
+        end = int(self._segment_starts[token_index + 1])
+        segments: List[Segment] = []
+        for i, feature_id in enumerate(self._segment_features[start:end].tolist()):
+            segment = Segment.with_features(self._features[feature_id])
+            segment.segment_number = i + 1
+            segments.append(segment)
+        token.segments = segments
+        return token
+
+    def _token_index(self, location: Location):
+        chapter_number = location.chapter_number
+        if chapter_number < 1 or chapter_number > len(self._chapters):
+            raise IndexError(f'Chapter out of range: {location}')
+
+        verse_index = int(self._chapter_verse_starts[chapter_number - 1]) + location.verse_number - 1
+        if location.verse_number < 1 or verse_index >= self._chapter_verse_starts[chapter_number]:
+            raise IndexError(f'Verse out of range: {location}')
+
+        token_index = int(self._verse_token_starts[verse_index]) + location.token_number - 1
+        if location.token_number < 1 or token_index >= self._verse_token_starts[verse_index + 1]:
+            raise IndexError(f'Token out of range: {location}')
+        return token_index
+
+
+def _code(lemma_service: LemmaService, name: str, value: Enum | str | None):
+    if name == 'lemma':
+        return -1 if value is None else lemma_service.value_of(value)
+    if value is None:
+        return 0
+    return value.value[0] if isinstance(value.value, tuple) else value.value
@@ -3,6 +3,7 @@ from typing import List
 
 from .segment import Segment
 from .tsv_reader import TsvReader
+from .morphology_snapshot import load_snapshot, save_snapshot
 from ..orthography.chapter import Chapter
 from ..orthography.token import Token
 from ..orthography.location import Location
@@ -14,12 +15,17 @@ from ..api.responses import SegmentResponse
 
 class MorphologyService:
     MORPHOLOGY_FILE = Path('.data/morphology.tsv')
+    SNAPSHOT_FILE = Path('.data/morphology.snapshot')
 
     def __init__(self, client: CorpusClient, lemma_service: LemmaService):
         self._chapters = [Chapter([]) for _ in range(114)]
         self._download_morphology(client)
         self._read_morphology(lemma_service)
 
+    @property
+    def token_count(self):
+        return sum(len(verse.tokens) for chapter in self._chapters for verse in chapter.verses)
+
     def token(self, location: Location):
         chapter = self._chapters[location.chapter_number - 1]
         verse = chapter.verses[location.verse_number - 1]
@@ -28,22 +34,15 @@ class MorphologyService:
 
     def _read_morphology(self, lemma_service: LemmaService):
 
-        # morphology
-        tokens: List[Token]
-        segments: List[List[Segment]]
-        with TsvReader(lemma_service) as tsv_reader:
-            with open(self.MORPHOLOGY_FILE, 'r') as file:
-                for line in file:
-                    tsv_reader.read_segment(line.strip())
-            tokens = tsv_reader.tokens
-            segments = tsv_reader.segments
+        # morphology, from the snapshot if it is up to date
+        tokens = load_snapshot(self.SNAPSHOT_FILE, self.MORPHOLOGY_FILE, lemma_service)
+        if tokens is None:
+            tokens = self._read_tsv(lemma_service)
+            save_snapshot(self.SNAPSHOT_FILE, self.MORPHOLOGY_FILE, tokens)
 
         # tokens
         verse: Verse = None
-        token_count = len(tokens)
-        for i in range(token_count):
-            token = tokens[i]
-            token.segments = segments[i]
+        for token in tokens:
 
             # new verse?
             location = token.location
@@ -57,6 +56,20 @@ class MorphologyService:
 
             verse.tokens.append(token)
 
+    def _read_tsv(self, lemma_service: LemmaService):
+        tokens: List[Token]
+        segments: List[List[Segment]]
+        with TsvReader(lemma_service) as tsv_reader:
+            with open(self.MORPHOLOGY_FILE, 'r') as file:
+                for line in file:
+                    tsv_reader.read_segment(line.strip())
+            tokens = tsv_reader.tokens
+            segments = tsv_reader.segments
+
+        for token, token_segments in zip(tokens, segments):
+            token.segments = token_segments
+        return tokens
+
     def _download_morphology(self, client: CorpusClient):
 
         if self.MORPHOLOGY_FILE.exists():
@@ -0,0 +1,107 @@
+from pathlib import Path
+from typing import Any, Dict, List
+import hashlib
+import os
+import joblib
+
+import numpy as np
+
+from .segment import Segment
+from .segment_features import SegmentFeatures, intern_features
+from ..orthography.location import Location
+from ..orthography.token import Token
+from ..lexicography.lemma_service import LemmaService
+from ..files import dump_atomically, hash_file
+
+# Tokens of the morphology file, as distinct feature records and integer arrays:
+# token locations, segment counts per token, and the feature record of each segment.
+SNAPSHOT_VERSION = 1
+FIELD_NAMES = ['type', 'part_of_speech', 'lemma', 'person', 'gender', 'number',
+               'mood', 'voice', 'case', 'state', 'pronoun_type', 'special']
+
+
+def save_snapshot(path: Path, source_path: Path, tokens: List[Token]):
+    feature_ids: Dict[SegmentFeatures, int] = {}
+    features: List[tuple] = []
+    segment_features: List[int] = []
+    for token in tokens:
+        for segment in token.segments:
+            feature_id = feature_ids.get(segment.features)
+            if feature_id is None:
+                feature_id = len(features)
+                feature_ids[segment.features] = feature_id
+                features.append(tuple(getattr(segment.features, name) for name in FIELD_NAMES))
+            segment_features.append(feature_id)
+
+    dump_atomically({
+        'version': SNAPSHOT_VERSION,
+        'source': _source_key(source_path),
+        'features': features,
+        'locations': np.array(
+            [(t.location.chapter_number, t.location.verse_number, t.location.token_number) for t in tokens],
+            dtype=np.uint16).reshape(-1, 3),
+        'segment_counts': np.array([len(token.segments) for token in tokens], dtype=np.uint8),
+        'segment_features': np.array(segment_features, dtype=np.uint32)}, path)
+
+
+def read_snapshot(path: Path, source_path: Path) -> Dict[str, Any] | None:
+    if not path.exists():
+        return None
+
+    # stale if the morphology file was modified, unless its content is unchanged
+    state = joblib.load(path)
+    if state.get('version') != SNAPSHOT_VERSION or not _same_source(state['source'], source_path):
+        return None
+    return state
+
+
+def snapshot_features(state: Dict[str, Any], lemma_service: LemmaService):
+
+    # lemmas are added in the order the morphology file first uses them
+    features: List[SegmentFeatures] = []
+    for values in state['features']:
+        record = intern_features(SegmentFeatures(**dict(zip(FIELD_NAMES, values))))
+        if record.lemma is not None:
+            lemma_service.add(record.lemma)
+        features.append(record)
+    return features
+
+
+def load_snapshot(path: Path, source_path: Path, lemma_service: LemmaService):
+    state = read_snapshot(path, source_path)
+    if state is None:
+        return None
+
+    features = snapshot_features(state, lemma_service)
+    tokens: List[Token] = []
+    segment_features = state['segment_features'].tolist()
+    start = 0
+    for (chapter_number, verse_number, token_number), segment_count in zip(
+            state['locations'].tolist(), state['segment_counts'].tolist()):
+        token = Token(Location(chapter_number, verse_number, token_number))
+        token.segments = []
+        for i in range(segment_count):
+            segment = Segment.with_features(features[segment_features[start + i]])
+            segment.segment_number = i + 1
+            token.segments.append(segment)
+        start += segment_count
+        tokens.append(token)
+    return tokens
+
+
+def _source_key(source_path: Path):
+    stat = os.stat(source_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': _sha256(source_path)}
+
+
+def _same_source(source: Dict, source_path: Path):
+    stat = os.stat(source_path)
+    if stat.st_mtime_ns == source['mtime_ns'] and stat.st_size == source['size']:
+        return True
+    return stat.st_size == source['size'] and _sha256(source_path) == source['sha256']
+
+
+def _sha256(path: Path):
+    digest = hashlib.sha256()
+    hash_file(digest, path)
+    return digest.hexdigest()
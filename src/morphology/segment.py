@@ -1,3 +1,5 @@
+from operator import attrgetter
+
 from .segment_type import SegmentType
 from .part_of_speech import PartOfSpeech
 from .person_type import PersonType
@@ -9,21 +11,45 @@ from .case_type import CaseType
 from .state_type import StateType
 from .pronoun_type import PronounType
 from .special_type import SpecialType
+from .segment_features import SegmentFeatures, intern_features
+
+
+def _feature(name: str):
+    def set(segment: 'Segment', value):
+        segment.features = segment.features.replace(name, value)
+
+    return property(attrgetter(f'features.{name}'), set)
 
 
+# A segment of a token. Its features are an immutable record, shared with other
+# segments once interned, so only the segment number is stored per segment.
+# Setting a feature replaces the record.
 class Segment:
+    __slots__ = ('features', 'segment_number')
 
     def __init__(self, type: SegmentType, part_of_speech: PartOfSpeech):
-        self.type = type
-        self.part_of_speech = part_of_speech
+        self.features = SegmentFeatures(type, part_of_speech)
         self.segment_number: int | None = None
-        self.lemma: str | None = None
-        self.person: PersonType | None = None
-        self.gender: GenderType | None = None
-        self.number: NumberType | None = None
-        self.mood: MoodType | None = None
-        self.voice: VoiceType | None = None
-        self.case: CaseType | None = None
-        self.state: StateType | None = None
-        self.pronoun_type: PronounType | None = None
-        self.special: SpecialType | None = None
+
+    @staticmethod
+    def with_features(features: SegmentFeatures):
+        segment = Segment.__new__(Segment)
+        segment.features = features
+        segment.segment_number = None
+        return segment
+
+    def intern(self):
+        self.features = intern_features(self.features)
+
+    type: SegmentType = _feature('type')
+    part_of_speech: PartOfSpeech = _feature('part_of_speech')
+    lemma: str | None = _feature('lemma')
+    person: PersonType | None = _feature('person')
+    gender: GenderType | None = _feature('gender')
+    number: NumberType | None = _feature('number')
+    mood: MoodType | None = _feature('mood')
+    voice: VoiceType | None = _feature('voice')
+    case: CaseType | None = _feature('case')
+    state: StateType | None = _feature('state')
+    pronoun_type: PronounType | None = _feature('pronoun_type')
+    special: SpecialType | None = _feature('special')
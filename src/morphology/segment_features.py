@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, Tuple
+
+from .segment_type import SegmentType
+from .part_of_speech import PartOfSpeech
+from .person_type import PersonType
+from .gender_type import GenderType
+from .number_type import NumberType
+from .mood_type import MoodType
+from .voice_type import VoiceType
+from .case_type import CaseType
+from .state_type import StateType
+from .pronoun_type import PronounType
+from .special_type import SpecialType
+
+
+# Immutable morphological features, shared by every segment with the same analysis.
+@dataclass(frozen=True, slots=True)
+class SegmentFeatures:
+    type: SegmentType
+    part_of_speech: PartOfSpeech
+    lemma: str | None = None
+    person: PersonType | None = None
+    gender: GenderType | None = None
+    number: NumberType | None = None
+    mood: MoodType | None = None
+    voice: VoiceType | None = None
+    case: CaseType | None = None
+    state: StateType | None = None
+    pronoun_type: PronounType | None = None
+    special: SpecialType | None = None
+    _hash: int | None = field(default=None, init=False, repr=False, compare=False)
+
+    # cached, as interned features are hashed on every lookup
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(tuple(getattr(self, name) for name in _FIELD_NAMES)))
+        return self._hash
+
+    # hashes of enums and strings differ between processes, so the cache isn't pickled
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in _FIELD_NAMES)
+
+    def __setstate__(self, state):
+        for name, value in zip(_FIELD_NAMES, state):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_hash', None)
+
+    # changes to interned features are memoized, and interned in turn
+    def replace(self, name: str, value: Any):
+        if _features.get(self) is not self:
+            return replace(self, **{name: value})
+
+        key = (self, name, value)
+        features = _replacements.get(key)
+        if features is None:
+            features = intern_features(replace(self, **{name: value}))
+            _replacements[key] = features
+        return features
+
+
+_FIELD_NAMES = [f.name for f in fields(SegmentFeatures) if f.compare]
+_features: Dict[SegmentFeatures, SegmentFeatures] = {}
+_replacements: Dict[Tuple[SegmentFeatures, str, Any], SegmentFeatures] = {}
+
+
+def intern_features(features: SegmentFeatures):
+    return _features.setdefault(features, features)
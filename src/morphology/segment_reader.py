@@ -1,6 +1,7 @@
 from typing import Dict, Tuple
 
 from .segment import Segment
+from .segment_features import SegmentFeatures
 from .segment_type import SegmentType
 from .part_of_speech import PartOfSpeech
 from .person_type import PersonType
@@ -45,8 +46,22 @@ class SegmentReader:
 
     def __init__(self, lemma_service: LemmaService):
         self.lemma_service = lemma_service
+        self._features: Dict[Tuple[str, bool], SegmentFeatures] = {}
 
     def read(self, morphology: str, has_stem: bool):
+
+        # each distinct morphology is parsed once, and its features shared
+        key = (morphology, has_stem)
+        features = self._features.get(key)
+        if features is not None:
+            return Segment.with_features(features)
+
+        segment = self._read(morphology, has_stem)
+        segment.intern()
+        self._features[key] = segment.features
+        return segment
+
+    def _read(self, morphology: str, has_stem: bool):
         if morphology.startswith('POS:'):
             return self._read_stem(morphology)
 
@@ -1,6 +1,7 @@
 from typing import List
 
 from .segment import Segment
+from .segment_features import SegmentFeatures, intern_features
 from .part_of_speech import PartOfSpeech
 from .pronoun_type import PronounType
 from .segment_type import SegmentType
@@ -48,11 +49,13 @@ class TsvReader:
         for i in range(segment_count):
             morpheme = self._morphemes[i]
             if morpheme.morphology is None:
-                segment = Segment(SegmentType.SUFFIX, PartOfSpeech.PRONOUN)
-                segment.person = stem.person
-                segment.gender = stem.gender
-                segment.number = stem.number
-                segment.pronoun_type = PronounType.SUBJECT
+                segment = Segment.with_features(intern_features(SegmentFeatures(
+                    SegmentType.SUFFIX,
+                    PartOfSpeech.PRONOUN,
+                    person=stem.person,
+                    gender=stem.gender,
+                    number=stem.number,
+                    pronoun_type=PronounType.SUBJECT)))
             else:
                 segment = self._segment_reader.read(morpheme.morphology, stem is not None)
 
@@ -69,12 +72,13 @@ class TsvReader:
                 stem = segment
 
             segments[i] = segment
-
         self.segments.append(segments)
         self._morphemes.clear()
 
 
 class Morpheme:
+    __slots__ = ('arabic', 'morphology')
+
     def __init__(self, arabic, morphology):
         self.arabic = arabic
         self.morphology = morphology
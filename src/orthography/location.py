@@ -6,7 +6,7 @@ def parse_location(text: str):
     return Location(int(parts[0]), int(parts[1]), int(parts[2]))
 
 
-@dataclass
+@dataclass(slots=True)
 class Location:
     chapter_number: int
     verse_number: int
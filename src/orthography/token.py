@@ -5,6 +5,7 @@ from .location import Location
 
 
 class Token:
+    __slots__ = ('location', 'segments')
 
     def __init__(self, location: Location):
         self.location = location
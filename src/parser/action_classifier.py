@@ -7,7 +7,7 @@ from ..syntax.word_type import WordType
 from ..syntax.syntax_node import SyntaxNode
 from ..syntax.syntax_graph import SyntaxGraph
 from ..syntax.subgraph import subgraph_end
-from ..syntax.relation import Relation
+from ..syntax.relation import SUBJECT_RELATIONS
 from ..lexicography.lemma_service import LemmaService
 from ..svm.model import Model
 
@@ -29,7 +29,9 @@ class ActionClassifier:
         self._queue = queue
 
     def action(self):
-        action = self._model.action(self.lemma_service, self._graph, self._stack, self._queue)
+        return self.valid_action(self._model.action(self.lemma_service, self._graph, self._stack, self._queue))
+
+    def valid_action(self, action: ParserAction | None):
         return action if self._is_valid_action(action) else ParserAction.reduce(0)
 
     def _is_valid_action(self, action: ParserAction):
@@ -76,11 +78,4 @@ class ActionClassifier:
         return False
 
     def _has_subject(self, head: SyntaxNode):
-        for edge in self._graph.edges:
-            if edge.head is head:
-                relation = edge.relation
-                if (relation == Relation.SUBJECT
-                    or relation == Relation.PASSIVE_SUBJECT
-                        or relation == Relation.SPECIAL_SUBJECT):
-                    return True
-        return False
+        return self._graph.dependent_relations(head) & SUBJECT_RELATIONS != 0
@@ -0,0 +1,54 @@
+from typing import Dict, List
+
+from .parser import Parser
+from ..syntax.syntax_graph import SyntaxGraph
+from ..lexicography.lemma_service import LemmaService
+from ..svm.model import Model, ActionRequest
+
+
+class BatchParser:
+
+    def __init__(self, model: Model, lemma_service: LemmaService, graphs: List[SyntaxGraph]):
+        self._model = model
+        self._lemma_service = lemma_service
+        self._graphs = graphs
+        self._parsers = [Parser(model, lemma_service, graph) for graph in graphs]
+        self.errors: List[Exception | None] = [None]*len(graphs)
+
+    def parse(self):
+
+        # advance all graphs in lockstep, so that each round makes
+        # one prediction per ensemble member for the whole batch
+        active = list(range(len(self._graphs)))
+        while active:
+            requests: Dict[int, ActionRequest] = {}
+            for i in active:
+                parser = self._parsers[i]
+                try:
+                    requests[i] = self._model.request(self._lemma_service, self._graphs[i], parser.stack, parser.queue)
+                except Exception as e:
+                    self.errors[i] = e
+
+            # resolve each ensemble member's requests apart, so a failed prediction
+            # only stops the graphs that asked for it
+            groups: Dict[int, List[int]] = {}
+            for i, request in requests.items():
+                groups.setdefault(request.classifier_index, []).append(i)
+            for group in groups.values():
+                try:
+                    self._model.resolve([requests[i] for i in group])
+                except Exception as e:
+                    for i in group:
+                        self.errors[i] = e
+                        del requests[i]
+
+            active = []
+            for i, request in requests.items():
+                parser = self._parsers[i]
+                try:
+                    if parser.step(parser.valid_action(request.action)):
+                        active.append(i)
+                except Exception as e:
+                    self.errors[i] = e
+
+        return self.errors
@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from .batch_parser import BatchParser
+from ..syntax.syntax_graph import SyntaxGraph
+from ..syntax.word_type import WordType
+from ..lexicography.lemma_service import LemmaService
+from ..svm.model import Model, load_model
+from ..svm.compact_model import load_compact_model
+
+_model: Model | None = None
+_lemma_service: LemmaService | None = None
+
+
+def parse_corpus(
+        model: Model | Path,
+        lemma_service: LemmaService,
+        graphs: List[SyntaxGraph],
+        workers: int = 1,
+        batch_size: int = 64) -> Tuple[List[SyntaxGraph], List[Exception | None]]:
+
+    # both paths parse graphs from their words alone
+    if any(graph.phrases or graph.edges for graph in graphs):
+        raise ValueError('Expected an unparsed graph.')
+
+    # in process
+    if workers <= 1:
+        if isinstance(model, Path):
+            model = _load_model(model, lemma_service)
+        output_graphs = [_copy_graph(graph) for graph in graphs]
+        errors = BatchParser(model, lemma_service, output_graphs).parse()
+        return (output_graphs, errors)
+
+    # Each worker loads the model once, then parses batches of graphs. A model passed
+    # by path is loaded by the workers themselves, so workers given a compact model
+    # file share its mapped pages rather than each unpickling a copy.
+    batches = [graphs[i:i + batch_size] for i in range(0, len(graphs), batch_size)]
+    output_graphs: List[SyntaxGraph] = []
+    errors: List[Exception | None] = []
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model, lemma_service)) as executor:
+        for batch, (batch_graphs, batch_errors) in zip(batches, executor.map(_parse_batch, batches)):
+
+            # graphs come back with copies of their tokens
+            for graph, output_graph in zip(batch, batch_graphs):
+                _restore_tokens(graph, output_graph)
+            output_graphs.extend(batch_graphs)
+            errors.extend(batch_errors)
+
+    return (output_graphs, errors)
+
+
+def _init_worker(model: Model | Path, lemma_service: LemmaService):
+    global _model, _lemma_service
+    _model = _load_model(model, lemma_service) if isinstance(model, Path) else model
+    _lemma_service = lemma_service
+
+
+# a model folder, or a compact model file
+def _load_model(path: Path, lemma_service: LemmaService):
+    if path.is_file():
+        return load_compact_model(path, lemma_service)
+    return load_model(path, lemma_service=lemma_service)
+
+
+def _parse_batch(graphs: List[SyntaxGraph]):
+    errors = BatchParser(_model, _lemma_service, graphs).parse()
+    return (graphs, errors)
+
+
+def _copy_graph(graph: SyntaxGraph):
+    output_graph = SyntaxGraph()
+    for word in graph.words:
+        output_graph.add_word(word.type, word.token, word.elided_text, word.elided_part_of_speech)
+    return output_graph
+
+
+def _restore_tokens(graph: SyntaxGraph, output_graph: SyntaxGraph):
+    tokens = [word.token for word in graph.words if word.type != WordType.ELIDED]
+    index = 0
+    for word in output_graph.words:
+        if word.type != WordType.ELIDED:
+            word.token = tokens[index]
+            index += 1
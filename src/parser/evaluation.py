@@ -0,0 +1,86 @@
+from typing import Dict, Set, Tuple
+
+from ..morphology.part_of_speech import PartOfSpeech
+from ..syntax.syntax_graph import SyntaxGraph
+from ..syntax.edge import Edge
+from ..syntax.relation import Relation
+
+
+class EdgeScore:
+
+    def __init__(self):
+        self.expected_edges = 0
+        self.output_edges = 0
+        self.equivalent_edges = 0
+
+    def merge(self, other: 'EdgeScore'):
+        self.expected_edges += other.expected_edges
+        self.output_edges += other.output_edges
+        self.equivalent_edges += other.equivalent_edges
+
+    @property
+    def precision(self):
+        return self.equivalent_edges / self.output_edges if self.output_edges else 0.0
+
+    @property
+    def recall(self):
+        return self.equivalent_edges / self.expected_edges if self.expected_edges else 0.0
+
+    @property
+    def f1_score(self):
+        precision = self.precision
+        recall = self.recall
+        return 2 * (precision * recall) / (precision + recall) if precision + recall else 0.0
+
+
+# Labeled attachment scores over a corpus, overall and by relation and part of
+# speech of the dependent. Edges are compared by their structural keys, so scoring
+# a graph is linear in its edges. Evaluations from worker processes can be merged.
+class Evaluation:
+
+    def __init__(self):
+        self.score = EdgeScore()
+        self.relations: Dict[Relation, EdgeScore] = {}
+        self.parts_of_speech: Dict[PartOfSpeech, EdgeScore] = {}
+
+    def compare(self, expected_graph: SyntaxGraph, output_graph: SyntaxGraph):
+        expected_keys: Set[Tuple] = set()
+        for edge in expected_graph.edges:
+            expected_keys.add(edge.key)
+            for score in self._scores(edge):
+                score.expected_edges += 1
+
+        for edge in output_graph.edges:
+            equivalent = edge.key in expected_keys
+            for score in self._scores(edge):
+                score.output_edges += 1
+                if equivalent:
+                    score.equivalent_edges += 1
+
+    def merge(self, other: 'Evaluation'):
+        self.score.merge(other.score)
+        for relation, score in other.relations.items():
+            self.relations.setdefault(relation, EdgeScore()).merge(score)
+        for part_of_speech, score in other.parts_of_speech.items():
+            self.parts_of_speech.setdefault(part_of_speech, EdgeScore()).merge(score)
+
+    @property
+    def precision(self):
+        return self.score.precision
+
+    @property
+    def recall(self):
+        return self.score.recall
+
+    @property
+    def f1_score(self):
+        return self.score.f1_score
+
+    def _scores(self, edge: Edge):
+        yield self.score
+        yield self.relations.setdefault(edge.relation, EdgeScore())
+
+        # phrase dependents have no part of speech
+        part_of_speech = edge.dependent.part_of_speech
+        if part_of_speech is not None:
+            yield self.parts_of_speech.setdefault(part_of_speech, EdgeScore())
@@ -1,10 +1,11 @@
-from typing import Dict, List
+from typing import List
 
 from .parser import Parser
 from .parser_action import ParserAction
 from ..morphology.part_of_speech import PartOfSpeech
 from ..syntax.syntax_node import SyntaxNode
 from ..syntax.syntax_graph import SyntaxGraph
+from ..syntax.graph_alignment import GraphAlignment
 from ..syntax.relation import Relation
 from ..syntax.word_type import WordType
 from ..syntax.subgraph import subgraph_end
@@ -16,7 +17,7 @@ class Oracle:
         self._expected_graph = expected_graph
         self._output_graph = output_graph
         self._parser = Parser(None, None, output_graph)
-        self._expected_node_map: Dict[int, SyntaxNode] = {}
+        self._alignment = GraphAlignment(expected_graph)
         self._trace_enabled = False
         self._build_node_map()
 
@@ -147,18 +148,9 @@ class Oracle:
         return self._expected_graph.phrase(self._expected_node(start), self._expected_node(end)) is not None
 
     def _has_all_edges(self, output_node: SyntaxNode):
-        expected_edges = 0
         expected_node = self._expected_node(output_node)
-        for edge in self._expected_graph.edges:
-            if edge.dependent is expected_node or edge.head is expected_node:
-                expected_edges += 1
-
-        output_edges = 0
-        for edge in self._output_graph.edges:
-            if edge.dependent is output_node or edge.head is output_node:
-                output_edges += 1
-
-        return expected_edges == output_edges
+        expected_edges = self._expected_graph.degree(expected_node) if expected_node is not None else 0
+        return expected_edges == self._output_graph.degree(output_node)
 
     def _add_elided_subject(self):
         output_node = self._stack(0)
@@ -173,10 +165,7 @@ class Oracle:
                 and not self._has_elided_subject(self._output_graph, output_node))
 
     def _has_elided_subject(self, graph: SyntaxGraph, node: SyntaxNode):
-        for edge in graph.edges:
-            if edge.head is not node:
-                continue
-
+        for edge in graph.dependents(node):
             if edge.relation == Relation.SUBJECT or edge.relation == Relation.PASSIVE_SUBJECT:
                 word = edge.dependent.word
                 if (word is not None and word.type == WordType.ELIDED
@@ -186,17 +175,11 @@ class Oracle:
         return False
 
     def _has_any_dependents(self, node: SyntaxNode):
-        for edge in self._output_graph.edges:
-            if edge.head is node:
-                return True
-        return False
+        return len(self._output_graph.dependents(node)) > 0
 
     def _has_any_expected_dependents(self, node: SyntaxNode):
         expected_node = self._expected_node(node)
-        for edge in self._expected_graph.edges:
-            if edge.head is expected_node:
-                return True
-        return False
+        return expected_node is not None and len(self._expected_graph.dependents(expected_node)) > 0
 
     def _expected_phrase(self, start: SyntaxNode, end: SyntaxNode):
         if start is None or end is None:
@@ -211,35 +194,7 @@ class Oracle:
         return self._expected_graph.edge(expected_node1, expected_node2)
 
     def _expected_node(self, output_node: SyntaxNode):
-
-        # mapped?
-        expected_node = self._expected_node_map.get(id(output_node))
-        if expected_node is not None:
-            return expected_node
-
-        # phrase
-        if output_node.is_phrase:
-            for node in self._expected_graph.phrases:
-                if node == output_node:
-                    self._expected_node_map[id(output_node)] = node
-                    return node
-
-        # segment
-        match: SyntaxNode | None = None
-        for node in self._expected_graph.segment_nodes:
-            if node == output_node:
-                if match is None:
-                    match = node
-                    continue
-                d1 = abs(output_node.index - node.index)
-                d2 = abs(output_node.index - match.index)
-                if d1 < d2:
-                    match = node
-
-        if match is not None:
-            self._expected_node_map[id(output_node)] = match
-            return match
-        return None
+        return self._alignment.expected_node(output_node)
 
     def _stack(self, stack_index: int):
         return self._parser.stack.node(stack_index)
@@ -250,7 +205,7 @@ class Oracle:
             if expected_node.word.type != WordType.ELIDED:
                 output_node = self._output_graph.segment_nodes[index]
                 index += 1
-                self._expected_node_map[id(output_node)] = expected_node
+                self._alignment.add(output_node, expected_node)
 
     def _trace(self, action: str):
         if self._trace_enabled:
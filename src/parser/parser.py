@@ -8,7 +8,7 @@ from ..morphology.voice_type import VoiceType
 from ..morphology.pronoun import get_pronoun
 from ..syntax.syntax_node import SyntaxNode
 from ..syntax.syntax_graph import SyntaxGraph
-from ..syntax.relation import Relation
+from ..syntax.relation import Relation, SUBJECT_RELATIONS
 from ..syntax.word_type import WordType
 from ..syntax.phrase_classifier import PhraseClassifier
 from ..syntax.subgraph import subgraph_end
@@ -23,16 +23,25 @@ class Parser:
         self.queue = Queue(graph)
         self._graph = graph
         self._action_classifier = ActionClassifier(model, lemma_service, graph, self.stack, self.queue)
+        self._steps = 0
 
     def parse(self):
-        n = 0
-        action: ParserAction | None = None
-        while (action := self._action_classifier.action()) is not None:
-            self.execute(action)
-            n += 1
-            if n > 250:
-                raise RuntimeError('Failed to parse graph after 250 steps.')
-        self._post_process()
+        while self.step(self._action_classifier.action()):
+            pass
+
+    def step(self, action: ParserAction | None):
+        if action is None:
+            self._post_process()
+            return False
+
+        self.execute(action)
+        self._steps += 1
+        if self._steps > 250:
+            raise RuntimeError('Failed to parse graph after 250 steps.')
+        return True
+
+    def valid_action(self, action: ParserAction | None):
+        return self._action_classifier.valid_action(action)
 
     def execute(self, action: ParserAction):
         if action.type == ActionType.SHIFT:
@@ -109,10 +118,12 @@ class Parser:
         return self.stack.node(stack_index)
 
     def _add_elided_pronoun(self, verb: SyntaxNode):
+        return self._graph.insert_elided_word(*self._elided_pronoun(verb))
+
+    def _elided_pronoun(self, verb: SyntaxNode):
         segment = verb.segment
         pronoun = None if not segment else get_pronoun(segment.person, segment.gender, segment.number)
-        word_index = self._graph.word_index(verb) + 1
-        return self._graph.insert_elided_word(word_index, PartOfSpeech.PRONOUN, pronoun)
+        return (self._graph.word_index(verb) + 1, PartOfSpeech.PRONOUN, pronoun)
 
     def _subject_relation(self, verb: SyntaxNode):
         segment = verb.segment
@@ -121,15 +132,14 @@ class Parser:
         return Relation.PASSIVE_SUBJECT if segment and segment.voice == VoiceType.PASSIVE else Relation.SUBJECT
 
     def _post_process(self):
-        for i in range(len(self._graph.segment_nodes) - 1, -1, -1):
-            verb = self._graph.segment_nodes[i]
-            if verb.part_of_speech == PartOfSpeech.VERB and not self._has_subject(verb) and verb.word.type == WordType.TOKEN:
-                self._graph.add_edge(self._add_elided_pronoun(verb), verb, self._subject_relation(verb))
+
+        # verbs from right to left, with their pronouns inserted in one pass
+        verbs = [
+            verb for verb in reversed(self._graph.segment_nodes)
+            if verb.part_of_speech == PartOfSpeech.VERB and not self._has_subject(verb) and verb.word.type == WordType.TOKEN]
+        pronouns = self._graph.insert_elided_words([self._elided_pronoun(verb) for verb in verbs])
+        for verb, pronoun in zip(verbs, pronouns):
+            self._graph.add_edge(pronoun, verb, self._subject_relation(verb))
 
     def _has_subject(self, head: SyntaxNode):
-        for edge in self._graph.edges:
-            if edge.head is head:
-                relation = edge.relation
-                if relation == Relation.SUBJECT or relation == Relation.PASSIVE_SUBJECT or relation == Relation.SPECIAL_SUBJECT:
-                    return True
-        return False
+        return self._graph.dependent_relations(head) & SUBJECT_RELATIONS != 0
@@ -0,0 +1,57 @@
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import json
+import struct
+
+import numpy as np
+
+# File layout: magic, version, manifest length, JSON manifest, then arrays.
+# Each array starts on a 64 byte boundary so it can be viewed in place.
+HEADER = struct.Struct('<4sIQ')
+ALIGNMENT = 64
+
+
+def save_arrays(path: Path, magic: bytes, version: int, manifest: Dict[str, Any], arrays: List[np.ndarray]):
+    arrays = [np.ascontiguousarray(array) for array in arrays]
+
+    # array offsets, relative to the end of the manifest
+    layout: List[Dict[str, Any]] = []
+    offset = 0
+    for array in arrays:
+        offset = _align(offset)
+        layout.append({'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)})
+        offset += array.nbytes
+
+    manifest_bytes = json.dumps({**manifest, 'arrays': layout}).encode()
+    data_start = _align(HEADER.size + len(manifest_bytes))
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(magic, version, len(manifest_bytes)))
+        file.write(manifest_bytes)
+        for array, entry in zip(arrays, layout):
+            file.write(b'\0' * (data_start + entry['offset'] - file.tell()))
+            file.write(array.tobytes())
+
+
+def load_arrays(path: Path, magic: bytes, version: int) -> Tuple[Dict[str, Any], List[np.ndarray]]:
+    with open(path, 'rb') as file:
+        file_magic, file_version, manifest_size = HEADER.unpack(file.read(HEADER.size))
+        if file_magic != magic or file_version != version:
+            raise ValueError(f'Unsupported model file: {path}')
+        manifest = json.loads(file.read(manifest_size))
+
+    # arrays are read-only views of the mapped file, shared between processes
+    data_start = _align(HEADER.size + manifest_size)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays: List[np.ndarray] = []
+    for entry in manifest['arrays']:
+        dtype = np.dtype(entry['dtype'])
+        start = data_start + entry['offset']
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        view = buffer[start:start + count * dtype.itemsize].view(dtype)
+        arrays.append(view.reshape(entry['shape']))
+    return (manifest, arrays)
+
+
+def _align(offset: int):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -0,0 +1,114 @@
+from sklearn.svm import SVC
+from scipy.sparse import csr_matrix
+import numpy as np
+
+from .primal import class_pairs, libsvm_dual_coef, libsvm_intercepts
+
+
+# SVM evaluator over binary features, with support vectors stored as packed uint64
+# bit rows. Each dot product is the popcount of the bitwise AND of the query and a
+# support vector. A drop-in replacement for SVC.predict, with libsvm's voting.
+class BitSvm:
+
+    # decision values closer to zero than this (relative to the sum of their
+    # absolute terms) are summed again in libsvm's order, so rounding matches
+    TIE_TOLERANCE = 1e-9
+
+    def __init__(
+            self,
+            gamma: float,
+            classes: np.ndarray,
+            n_support: np.ndarray,
+            support_vectors: np.ndarray,
+            dual_coef: np.ndarray,
+            intercepts: np.ndarray):
+
+        self.gamma = gamma
+        self.classes = classes
+        self._support_vectors = support_vectors
+        self._dual_coef = dual_coef
+        self._intercepts = intercepts.astype(np.float64)
+        self._ends = np.cumsum(n_support)
+        self._starts = self._ends - n_support
+        self._first, self._second = class_pairs(len(classes))
+
+    @staticmethod
+    def from_svc(model: SVC):
+        return BitSvm(
+            model._gamma,
+            model.classes_,
+            model.n_support_,
+            pack_bits(csr_matrix(model.support_vectors_)),
+            libsvm_dual_coef(model),
+            libsvm_intercepts(model))
+
+    def predict(self, matrix: csr_matrix):
+        codes = np.empty(matrix.shape[0], dtype=self.classes.dtype)
+        for row in range(matrix.shape[0]):
+            features = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+            decision_values = self.decision_values(features)
+
+            # one-vs-one voting, as in libsvm
+            first = self._first
+            second = self._second
+            votes = np.bincount(np.where(decision_values > 0, first, second), minlength=len(self.classes))
+            codes[row] = self.classes[np.argmax(votes)]
+        return codes
+
+    def decision_values(self, features: np.ndarray):
+        terms = self._dual_coef * self._kernel(features)
+        first = self._first
+        second = self._second
+
+        # sums of coefficient * kernel for each coefficient row and class
+        sums = np.add.reduceat(terms, self._starts, axis=1)
+        magnitudes = np.add.reduceat(np.abs(terms), self._starts, axis=1)
+        decision_values = sums[second - 1, first] + sums[first, second] + self._intercepts
+
+        # near ties
+        bounds = magnitudes[second - 1, first] + magnitudes[first, second] + np.abs(self._intercepts)
+        for p in np.flatnonzero(np.abs(decision_values) <= self.TIE_TOLERANCE * bounds):
+            decision_values[p] = self._libsvm_decision_value(terms, p)
+        return decision_values
+
+    def _kernel(self, features: np.ndarray):
+
+        # pack the query, then AND it with the support vector words it overlaps
+        features = features.astype(np.int64)
+        query = np.zeros(self._support_vectors.shape[1], dtype=np.uint64)
+        np.bitwise_or.at(query, features >> 6, np.left_shift(np.uint64(1), (features & 63).astype(np.uint64)))
+        words = np.flatnonzero(query)
+        counts = popcount(self._support_vectors[:, words] & query[words]).sum(axis=1)
+        return np.square(self.gamma * counts.astype(np.float64))
+
+    def _libsvm_decision_value(self, terms: np.ndarray, p: int):
+
+        # libsvm accumulates the terms of class i, then class j, from zero
+        i = self._first[p]
+        j = self._second[p]
+        segment = np.concatenate((
+            terms[j - 1, self._starts[i]:self._ends[i]],
+            terms[i, self._starts[j]:self._ends[j]]))
+        return np.cumsum(segment)[-1] + self._intercepts[p]
+
+
+def pack_bits(vectors: csr_matrix):
+    if np.any(vectors.data != 1):
+        raise ValueError('Support vectors should be binary.')
+
+    rows = np.repeat(np.arange(vectors.shape[0]), np.diff(vectors.indptr))
+    columns = vectors.indices.astype(np.int64)
+    words = np.zeros((vectors.shape[0], (vectors.shape[1] + 63) // 64), dtype=np.uint64)
+    np.bitwise_or.at(words, (rows, columns >> 6), np.left_shift(np.uint64(1), (columns & 63).astype(np.uint64)))
+    return words
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words: np.ndarray):
+        return np.bitwise_count(words)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words: np.ndarray):
+        counts = _BYTE_COUNTS[np.ascontiguousarray(words).view(np.uint8)]
+        return counts.reshape(words.shape + (8,)).sum(axis=-1)
@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import Any, Dict, List
+import hashlib
+import joblib
+
+from scipy.sparse import csr_matrix
+from sklearn.svm import SVC
+import numpy as np
+
+from .array_file import load_arrays, save_arrays
+from .ensemble import Ensemble
+from .bit_svm import BitSvm, pack_bits
+from .model import Model, ModelFolder, SvmModel, check_layout, update_digest
+from .primal import libsvm_dual_coef, libsvm_intercepts
+from ..lexicography.lemma_service import LemmaService
+
+# Ensemble members as bit-packed SVMs, in an array file that each process maps.
+MAGIC = b'QSVM'
+VERSION = 1
+
+
+def export_compact_model(model_folder: Path, path: Path, dtype: type = np.float32):
+    members: List[Dict[str, Any]] = []
+    arrays: List[np.ndarray] = []
+    digest = hashlib.sha256(np.dtype(dtype).name.encode())
+
+    def add_array(array: np.ndarray):
+        arrays.append(array)
+        return len(arrays) - 1
+
+    for i in range(Ensemble.ENSEMBLE_COUNT):
+
+        txt_file = model_folder / f'{i:02d}.txt'
+        if txt_file.exists():
+            update_digest(digest, txt_file)
+            with open(txt_file, 'r') as file:
+                members.append({'index': i, 'action': int(file.read().strip())})
+            continue
+
+        svm_file = model_folder / f'{i:02d}.svm'
+        if svm_file.exists():
+            update_digest(digest, svm_file)
+            model: SVC = joblib.load(svm_file)
+            members.append({
+                'index': i,
+                'gamma': float(model._gamma),
+                'feature_count': int(model.shape_fit_[1]),
+                'classes': add_array(model.classes_.astype(np.int32)),
+                'n_support': add_array(model.n_support_.astype(np.int32)),
+                'support_vectors': add_array(pack_bits(csr_matrix(model.support_vectors_))),
+                'dual_coef': add_array(libsvm_dual_coef(model).astype(dtype)),
+                'intercepts': add_array(libsvm_intercepts(model).astype(dtype))})
+
+    save_arrays(path, MAGIC, VERSION, {
+        'fingerprint': digest.hexdigest(),
+        'layout': ModelFolder(model_folder).layout(),
+        'members': members}, arrays)
+
+
+def load_compact_model(path: Path, lemma_service: LemmaService | None = None):
+    (manifest, arrays) = load_arrays(path, MAGIC, VERSION)
+    if lemma_service is not None:
+        check_layout(manifest['layout'], lemma_service)
+
+    svm_models: List[SvmModel | None] = [None]*Ensemble.ENSEMBLE_COUNT
+    for member in manifest['members']:
+        if 'action' in member:
+            svm_models[member['index']] = SvmModel(action=member['action'])
+            continue
+
+        model = BitSvm(
+            member['gamma'],
+            arrays[member['classes']],
+            arrays[member['n_support']],
+            arrays[member['support_vectors']],
+            arrays[member['dual_coef']],
+            arrays[member['intercepts']])
+        svm_models[member['index']] = SvmModel(model=model)
+
+    return Model(svm_models, manifest['fingerprint'], layout=manifest['layout'])
+
@@ -0,0 +1,127 @@
+from typing import Dict, List
+from enum import Enum
+import hashlib
+import json
+import weakref
+
+from ..morphology.segment_type import SegmentType
+from ..morphology.part_of_speech import PartOfSpeech
+from ..morphology.mood_type import MoodType
+from ..morphology.voice_type import VoiceType
+from ..morphology.case_type import CaseType
+from ..morphology.state_type import StateType
+from ..morphology.pronoun_type import PronounType
+from ..morphology.special_type import SpecialType
+from ..syntax.relation import Relation
+from ..syntax.phrase_type import PhraseType
+from ..lexicography.lemma_service import LemmaService
+
+
+class FeatureBlock:
+    def __init__(self, name: str, offset: int, size: int, labels: List[str] | None = None):
+        self.name = name
+        self.offset = offset
+        self.size = size
+        self.labels = labels
+
+
+class PositionLayout:
+    def __init__(self):
+        self.part_of_speech = 0
+        self.phrase_type = 0
+        self.voice = 0
+        self.mood = 0
+        self.case = 0
+        self.state = 0
+        self.pronoun_type = 0
+        self.segment_type = 0
+        self.special = 0
+        self.lemma = 0
+        self.dependents = 0
+        self.valid_subgraph = 0
+        self.edge = 0
+
+
+# Offsets of each feature block, for the s0, s1, s2 and q0 positions. Enum values
+# are 1-based, so the last value of a block shares its index with the first slot of
+# the next block. This is the encoding the models were trained with.
+class FeatureLayout:
+    POSITIONS = ['s0', 's1', 's2', 'q0']
+
+    _layouts: 'weakref.WeakKeyDictionary[LemmaService, FeatureLayout]' = weakref.WeakKeyDictionary()
+
+    def __init__(self, lemma_service: LemmaService):
+        self.lemma_count = lemma_service.count
+        self.vocabulary = _vocabulary_digest(lemma_service)
+        self.blocks: List[FeatureBlock] = []
+        self.positions: List[PositionLayout] = []
+        self.size = 0
+
+        for position in self.POSITIONS:
+            layout = PositionLayout()
+            layout.part_of_speech = self._add_enum(position, 'part_of_speech', PartOfSpeech)
+            layout.phrase_type = self._add_enum(position, 'phrase_type', PhraseType)
+            layout.voice = self._add_enum(position, 'voice', VoiceType)
+            layout.mood = self._add_enum(position, 'mood', MoodType)
+            layout.case = self._add_enum(position, 'case', CaseType)
+            layout.state = self._add_enum(position, 'state', StateType)
+            layout.pronoun_type = self._add_enum(position, 'pronoun_type', PronounType)
+            layout.segment_type = self._add_enum(position, 'segment_type', SegmentType)
+            layout.special = self._add_enum(position, 'special', SpecialType)
+            layout.lemma = self._add_block(position, 'lemma', self.lemma_count, list(lemma_service.lemmas))
+            layout.dependents = self._add_block(
+                position, 'dependents', len(Relation), [relation.tag for relation in Relation])
+            layout.valid_subgraph = self._add_block(position, 'valid_subgraph', 1)
+            layout.edge = self._add_block(position, 'edge', 1)
+            self.positions.append(layout)
+
+    @staticmethod
+    def for_lemma_service(lemma_service: LemmaService):
+
+        # rebuilt if lemmas were added since
+        layout = FeatureLayout._layouts.get(lemma_service)
+        if layout is None or layout.lemma_count != lemma_service.count:
+            layout = FeatureLayout(lemma_service)
+            FeatureLayout._layouts[lemma_service] = layout
+        return layout
+
+    def name(self, index: int):
+        for block in self.blocks:
+            if block.offset <= index < block.offset + block.size:
+                offset = index - block.offset
+                label = block.labels[offset] if block.labels is not None else str(offset)
+                return f'{block.name}:{label}'
+        raise ValueError(f'Feature index out of range: {index}')
+
+    @property
+    def signature(self) -> Dict[str, int | str]:
+        return {'size': self.size, 'lemma_count': self.lemma_count, 'vocabulary': self.vocabulary}
+
+    def to_json(self):
+        return json.dumps(self.signature)
+
+    def check(self, signature: Dict[str, int | str]):
+        if signature != self.signature:
+            raise ValueError(
+                f'Model was trained against a different feature layout: '
+                f'{signature} (model) vs {self.signature} (lemma service).')
+
+    def _add_enum(self, position: str, name: str, enum_type: type[Enum]):
+
+        # labels are indexed by value, and index 0 is unused by its own block
+        labels = ['-'] + [value.name for value in enum_type]
+        return self._add_block(position, name, len(enum_type), labels)
+
+    def _add_block(self, position: str, name: str, size: int, labels: List[str] | None = None):
+        offset = self.size
+        self.blocks.append(FeatureBlock(f'{position}.{name}', offset, size, labels))
+        self.size += size
+        return offset
+
+
+def _vocabulary_digest(lemma_service: LemmaService):
+    digest = hashlib.sha256()
+    for lemma in lemma_service.lemmas:
+        digest.update(lemma.encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
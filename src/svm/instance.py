@@ -1,18 +1,8 @@
 from typing import List
-from enum import Enum
 
-from ..morphology.segment_type import SegmentType
-from ..morphology.part_of_speech import PartOfSpeech
-from ..morphology.mood_type import MoodType
-from ..morphology.voice_type import VoiceType
-from ..morphology.case_type import CaseType
-from ..morphology.state_type import StateType
-from ..morphology.pronoun_type import PronounType
-from ..morphology.special_type import SpecialType
+from .feature_layout import FeatureLayout
 from ..syntax.syntax_node import SyntaxNode
 from ..syntax.syntax_graph import SyntaxGraph
-from ..syntax.relation import Relation
-from ..syntax.phrase_type import PhraseType
 from ..syntax.subgraph import subgraph_end
 from ..lexicography.lemma_service import LemmaService
 from ..parser.stack import Stack
@@ -21,9 +11,9 @@ from ..parser.queue import Queue
 
 class Instance:
 
-    def __init__(self):
+    def __init__(self, size: int = 0):
         self.feature_vector: List[int] = []
-        self.size: int = 0
+        self.size: int = size
 
     @staticmethod
     def instance(
@@ -32,59 +22,60 @@ class Instance:
             stack: Stack,
             queue: Queue):
 
-        instance = Instance()
-        for x in [stack.node(0), stack.node(1), stack.node(2), queue.peek()]:
-
-            instance.add_tagged_enum(x.part_of_speech if x else None, PartOfSpeech)
-            instance.add_tagged_enum(x.phrase_type if x else None, PhraseType)
-
-            s = x.segment if x else None
-            instance.add_enum(s.voice if s else None, VoiceType)
-            instance.add_tagged_enum(s.mood if s else None, MoodType)
-            instance.add_enum(s.case if s else None, CaseType)
-            instance.add_enum(s.state if s else None, StateType)
-            instance.add_enum(s.pronoun_type if s else None, PronounType)
-            instance.add_enum(s.type if s else None, SegmentType)
-            instance.add_tagged_enum(s.special if s else None, SpecialType)
-
-            lemma = s.lemma if s is not None else None
-            instance.add_value(lemma_service.value_of(lemma) if lemma is not None else -1, lemma_service.count)
-
-            for relation in Relation:
-                instance.add_bit(Instance._has_dependent(graph, x, relation))
-
-            instance.add_bit(Instance._is_valid_subgraph(graph, x))
-            instance.add_bit(Instance._is_edge(graph, stack))
+        layout = FeatureLayout.for_lemma_service(lemma_service)
+        instance = Instance(layout.size)
+        feature_vector = instance.feature_vector
+        nodes = [stack.node(0), stack.node(1), stack.node(2), queue.peek()]
+        for x, offsets in zip(nodes, layout.positions):
+            if x is None:
+                continue
+
+            part_of_speech = x.part_of_speech
+            if part_of_speech is not None:
+                feature_vector.append(offsets.part_of_speech + part_of_speech.value[0])
+            phrase_type = x.phrase_type
+            if phrase_type is not None:
+                feature_vector.append(offsets.phrase_type + phrase_type.value[0])
+
+            s = x.segment
+            if s is not None:
+                if s.voice is not None:
+                    feature_vector.append(offsets.voice + s.voice.value)
+                if s.mood is not None:
+                    feature_vector.append(offsets.mood + s.mood.value[0])
+                if s.case is not None:
+                    feature_vector.append(offsets.case + s.case.value)
+                if s.state is not None:
+                    feature_vector.append(offsets.state + s.state.value)
+                if s.pronoun_type is not None:
+                    feature_vector.append(offsets.pronoun_type + s.pronoun_type.value)
+                if s.type is not None:
+                    feature_vector.append(offsets.segment_type + s.type.value)
+                if s.special is not None:
+                    feature_vector.append(offsets.special + s.special.value[0])
+                if s.lemma is not None:
+                    feature_vector.append(offsets.lemma + lemma_service.value_of(s.lemma))
+
+            # one bit per relation, in enum order
+            dependent_relations = graph.dependent_relations(x)
+            while dependent_relations:
+                bit = dependent_relations & -dependent_relations
+                feature_vector.append(offsets.dependents + bit.bit_length() - 1)
+                dependent_relations ^= bit
+
+            if Instance._is_valid_subgraph(graph, x):
+                feature_vector.append(offsets.valid_subgraph)
+
+        # the edge feature depends only on the stack, so is set for every position
+        if Instance._is_edge(graph, stack):
+            for offsets in layout.positions:
+                feature_vector.append(offsets.edge)
+
+        # a special type's last value shares an index with the first lemma
+        instance.feature_vector = sorted(set(feature_vector))
 
         return instance
 
-    def add_bit(self, bit: bool):
-        if bit:
-            self.feature_vector.append(self.size)
-        self.size += 1
-
-    def add_enum(self, value: Enum | None, enum_type: type[Enum]):
-        if value is not None:
-            self.feature_vector.append(self.size + value.value)
-        self.size += len(enum_type)
-
-    def add_tagged_enum(self, value: Enum | None, enum_type: type[Enum]):
-        if value is not None:
-            self.feature_vector.append(self.size + value.value[0])
-        self.size += len(enum_type)
-
-    def add_value(self, value: int, size: int):
-        if value >= 0:
-            self.feature_vector.append(self.size + value)
-        self.size += size
-
-    @staticmethod
-    def _has_dependent(graph: SyntaxGraph, head: SyntaxNode, relation: Relation):
-        for edge in graph.edges:
-            if edge.head is head and edge.relation is relation:
-                return True
-        return False
-
     @staticmethod
     def _is_valid_subgraph(graph: SyntaxGraph, node: SyntaxNode):
         if node is not None and not node.is_phrase and graph.head(node) is None:
@@ -1,64 +1,351 @@
+from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List, Tuple
+import hashlib
+import json
+import threading
 import joblib
 
-from scipy.sparse import lil_matrix
+from scipy.sparse import csr_matrix
 from sklearn.svm import SVC
+import numpy as np
 
 from .instance import Instance
 from .ensemble import Ensemble
+from .feature_layout import FeatureLayout
+from .bit_svm import BitSvm
+from .primal import PrimalModel
 from ..syntax.syntax_graph import SyntaxGraph
 from ..parser.stack import Stack
 from ..parser.queue import Queue
 from ..parser.parser_action import decode_parser_action
 from ..lexicography.lemma_service import LemmaService
+from ..files import dump_atomically, hash_file
 
 
 class SvmModel:
-    def __init__(self, action: int | None = None, model: SVC | None = None):
+    def __init__(self, action: int | None = None, model: SVC | BitSvm | None = None, primal: PrimalModel | None = None):
         self.action = action
         self.model = model
+        self.primal = primal
+
+
+DecisionKey = Tuple[int, int, Tuple[int, ...]]
+
+
+# Least recently used parser decisions. The cache can be shared by parsers on
+# different threads, so each access holds a lock.
+class DecisionCache:
+
+    def __init__(self, capacity: int = 100000):
+        if capacity <= 0:
+            raise ValueError(f'Invalid cache capacity: {capacity}')
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[DecisionKey, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: DecisionKey):
+        with self._lock:
+            action = self._entries.get(key)
+            if action is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return action
+
+    def put(self, key: DecisionKey, action: int):
+        with self._lock:
+            self._entries[key] = action
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    @property
+    def size(self):
+        return len(self._entries)
+
+    def save(self, path: Path, fingerprint: str):
+
+        with self._lock:
+            entries = list(self._entries.items())
+        dump_atomically({'fingerprint': fingerprint, 'entries': entries}, path)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(path: Path, fingerprint: str, capacity: int = 100000):
+        cache = DecisionCache(capacity)
+        if not path.exists():
+            return cache
+
+        # decisions from a different model are discarded
+        state = joblib.load(path)
+        if state.get('fingerprint') != fingerprint:
+            return cache
+
+        for key, action in state['entries']:
+            cache.put(key, action)
+        return cache
+
+
+class ActionRequest:
+    def __init__(self, classifier_index: int, instance: Instance | None = None, code: int | None = None):
+        self.classifier_index = classifier_index
+        self.instance = instance
+        self.code = code
+
+    @property
+    def action(self):
+        if self.code is None:
+            raise ValueError('Unresolved action request.')
+        return decode_parser_action(self.code)
+
+    @property
+    def key(self) -> DecisionKey:
+        instance = self.instance
+        return (self.classifier_index, instance.size, tuple(instance.feature_vector))
 
 
 class Model:
-    def __init__(self, svm_models: List[SvmModel | None]):
+    def __init__(
+            self,
+            svm_models: List[SvmModel | None],
+            fingerprint: str | None = None,
+            loader: 'ModelFolder | None' = None,
+            layout: Dict[str, int | str] | None = None):
+
         self._svm_models = svm_models
+        self._rows = threading.local()
+        self._fingerprint = fingerprint
+        self.cache: DecisionCache | None = None
+
+        # the feature layout the model was trained with, checked against the layout
+        # of each lemma service the model is used with
+        self._layout = layout
+        self._checked_layout: FeatureLayout | None = None
+
+        # members are loaded on first use if there is a loader
+        self._loader = loader
+        self._loaded = [loader is None]*len(svm_models)
+        self._locks = [threading.Lock() for _ in svm_models]
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None and self._loader is not None:
+            self._fingerprint = self._loader.fingerprint()
+        return self._fingerprint
+
+    def warm_up(self, classifier_indices: Iterable[int] | None = None):
+        if classifier_indices is None:
+            classifier_indices = range(len(self._svm_models))
+        for classifier_index in classifier_indices:
+            self._svm_model(classifier_index)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_locks']
+        del state['_rows']
+        state['_checked_layout'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._locks = [threading.Lock() for _ in self._svm_models]
+        self._rows = threading.local()
 
     def action(self, lemma_service: LemmaService, graph: SyntaxGraph, stack: Stack, queue: Queue):
+        request = self.request(lemma_service, graph, stack, queue)
+        self.resolve([request])
+        return request.action
+
+    def request(self, lemma_service: LemmaService, graph: SyntaxGraph, stack: Stack, queue: Queue):
+        self._check_layout(lemma_service)
         classifier_index = Ensemble.classifier_index(stack.node(0))
-        svm_model = self._svm_models[classifier_index]
+        svm_model = self._svm_model(classifier_index)
         if svm_model == None:
+            return ActionRequest(classifier_index, code=0)
+
+        if svm_model.action is not None:
+            return ActionRequest(classifier_index, code=svm_model.action)
+
+        instance = Instance.instance(lemma_service, graph, stack, queue)
+        return ActionRequest(classifier_index, instance=instance)
+
+    def resolve(self, requests: List[ActionRequest]):
+
+        # group unresolved requests by ensemble member
+        pending: Dict[int, List[ActionRequest]] = {}
+        for request in requests:
+            if request.code is None:
+                request.code = self._lookup(request)
+                if request.code is None:
+                    pending.setdefault(request.classifier_index, []).append(request)
+
+        # one prediction per ensemble member
+        for classifier_index, group in pending.items():
+            matrix = (self._feature_row().matrix(group[0].instance) if len(group) == 1
+                      else feature_matrix([request.instance for request in group]))
+
+            codes = self._svm_model(classifier_index).model.predict(matrix)
+            for request, code in zip(group, codes):
+                request.code = int(code)
+                if self.cache is not None:
+                    self.cache.put(request.key, request.code)
+
+    def _lookup(self, request: ActionRequest):
+        cache = self.cache
+        if cache is not None:
+            code = cache.get(request.key)
+            if code is not None:
+                return code
+
+        primal = self._svm_model(request.classifier_index).primal
+        if primal is None:
             return None
 
-        action = svm_model.action
-        if action is None:
-            instance = Instance.instance(lemma_service, graph, stack, queue)
-            feature_vector = instance.feature_vector
+        code = primal.predict(request.instance.feature_vector)
+        if code is not None and cache is not None:
+            cache.put(request.key, code)
+        return code
 
-            matrix = lil_matrix((1, instance.size))
-            for index in feature_vector:
-                matrix[0, index] = 1
+    def _check_layout(self, lemma_service: LemmaService):
 
-            action = int(svm_model.model.predict(matrix)[0])
+        # layouts are rebuilt when lemmas are added, so each new layout is checked once
+        layout = FeatureLayout.for_lemma_service(lemma_service)
+        if layout is not self._checked_layout:
+            check_layout(self._layout, lemma_service)
+            self._checked_layout = layout
 
-        return decode_parser_action(action)
+    # query matrices are views over the row's buffers, so each thread has its own row
+    def _feature_row(self):
+        row = getattr(self._rows, 'row', None)
+        if row is None:
+            row = FeatureRow()
+            self._rows.row = row
+        return row
 
+    def _svm_model(self, classifier_index: int):
+        if not self._loaded[classifier_index]:
+            with self._locks[classifier_index]:
+                if not self._loaded[classifier_index]:
+                    self._svm_models[classifier_index] = self._loader.load(classifier_index)
+                    self._loaded[classifier_index] = True
+        return self._svm_models[classifier_index]
 
-def load_model(modelPath: Path):
-    modelCount = Ensemble.ENSEMBLE_COUNT
-    svm_models: List[SvmModel | None] = [None]*modelCount
-    for i in range(modelCount):
 
-        txt_file = modelPath / f'{i:02d}.txt'
+# Single-row CSR query matrix, built from reusable buffers on each parser step.
+# Each matrix is only valid until the next call, so a row is used by one thread.
+class FeatureRow:
+
+    def __init__(self, capacity: int = 256):
+        self._indices = np.empty(capacity, dtype=np.int32)
+        self._data = np.ones(capacity, dtype=np.float64)
+        self._indptr = np.zeros(2, dtype=np.int32)
+
+    def matrix(self, instance: Instance):
+        feature_vector = instance.feature_vector
+        n = len(feature_vector)
+        if n > len(self._indices):
+            self._indices = np.empty(2 * n, dtype=np.int32)
+            self._data = np.ones(2 * n, dtype=np.float64)
+
+        # feature indices are added in increasing order, so the row is already canonical
+        indices = self._indices[:n]
+        indices[:] = feature_vector
+        self._indptr[1] = n
+        return csr_matrix((self._data[:n], indices, self._indptr), shape=(1, instance.size), copy=False)
+
+
+def feature_matrix(instances: List[Instance]):
+    indptr = np.zeros(len(instances) + 1, dtype=np.int32)
+    np.cumsum([len(instance.feature_vector) for instance in instances], out=indptr[1:])
+    indices = np.fromiter(
+        (index for instance in instances for index in instance.feature_vector),
+        dtype=np.int32,
+        count=indptr[-1])
+
+    data = np.ones(indptr[-1], dtype=np.float64)
+    return csr_matrix((data, indices, indptr), shape=(len(instances), instances[0].size), copy=False)
+
+
+class ModelFolder:
+    LAYOUT_FILE = 'layout.json'
+
+    def __init__(self, model_path: Path, bit_packed: bool = False):
+        self.model_path = model_path
+        self.bit_packed = bit_packed
+
+    def layout(self):
+        layout_file = self.model_path / self.LAYOUT_FILE
+        if not layout_file.exists():
+            return None
+        with open(layout_file, 'r') as file:
+            return json.load(file)
+
+    def load(self, classifier_index: int):
+        txt_file = self.model_path / f'{classifier_index:02d}.txt'
         if txt_file.exists():
             with open(txt_file, 'r') as file:
                 action = int(file.read().strip())
-                svm_models[i] = SvmModel(action=action)
-                continue
+                return SvmModel(action=action)
 
-        svm_file = modelPath / f'{i:02d}.svm'
+        svm_file = self.model_path / f'{classifier_index:02d}.svm'
         if svm_file.exists():
             model: SVC = joblib.load(svm_file)
-            svm_models[i] = SvmModel(model=model)
+            primal_file = svm_file.with_suffix('.primal')
+            primal = PrimalModel.load(primal_file) if primal_file.exists() else None
+            return SvmModel(model=BitSvm.from_svc(model) if self.bit_packed else model, primal=primal)
+
+        return None
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for i in range(Ensemble.ENSEMBLE_COUNT):
+            for suffix in ('txt', 'svm'):
+                path = self.model_path / f'{i:02d}.{suffix}'
+                if path.exists():
+                    update_digest(digest, path)
+                    break
+        return digest.hexdigest()
+
+
+def load_model(
+        modelPath: Path,
+        lazy: bool = False,
+        bit_packed: bool = False,
+        lemma_service: LemmaService | None = None):
+
+    # without a lemma service, the layout is checked when the model is first used
+    folder = ModelFolder(modelPath, bit_packed)
+    layout = folder.layout()
+    if lemma_service is not None:
+        check_layout(layout, lemma_service)
+
+    modelCount = Ensemble.ENSEMBLE_COUNT
+    if lazy:
+        return Model([None]*modelCount, loader=folder, layout=layout)
+
+    svm_models = [folder.load(i) for i in range(modelCount)]
+    return Model(svm_models, folder.fingerprint(), layout=layout)
+
+
+def check_layout(layout: Dict[str, int | str] | None, lemma_service: LemmaService):
+
+    # models saved before layouts were recorded can't be checked
+    if layout is not None:
+        FeatureLayout.for_lemma_service(lemma_service).check(layout)
+
 
-    return Model(svm_models)
+def update_digest(digest, path: Path):
+    digest.update(path.name.encode())
+    hash_file(digest, path)
@@ -0,0 +1,225 @@
+from pathlib import Path
+from typing import Dict, List
+import joblib
+
+from scipy.sparse import coo_matrix, csr_matrix
+from sklearn.svm import SVC
+import numpy as np
+
+from .array_file import load_arrays, save_arrays
+
+# Expanded weights, in an array file that each process maps.
+MAGIC = b'QPRM'
+VERSION = 1
+
+
+# Explicit expansion of a degree 2 polynomial SVM over binary features. For binary
+# vectors, the kernel (gamma * x.sv)^2 sums gamma^2 * sv_i * sv_j over each pair of
+# active features i <= j in x, so every pairwise decision value is a sum of weights
+# over the feature pairs of the query, independent of the number of support vectors.
+class PrimalModel:
+
+    # Decision values closer to zero than this (relative to their magnitude bound)
+    # could be rounded to the other side by libsvm, so they are left to the SVC.
+    # Weights stored at lower precision widen the tolerance by their rounding error.
+    TIE_TOLERANCE = 1e-9
+
+    def __init__(
+            self,
+            classes: np.ndarray,
+            gamma: float,
+            feature_count: int,
+            keys: np.ndarray,
+            weights: csr_matrix,
+            intercepts: np.ndarray,
+            coefficient_bounds: np.ndarray,
+            coverage: csr_matrix):
+
+        self.classes = classes
+        self.gamma = gamma
+        self.feature_count = feature_count
+        self._keys = keys
+        self._weights = weights
+        self._intercepts = intercepts
+        self._coefficient_bounds = coefficient_bounds
+        self._coverage = coverage
+        self._pairs = class_pairs(len(classes))
+        self._tie_tolerance = max(self.TIE_TOLERANCE, 4 * float(np.finfo(weights.dtype).eps))
+        self._triangles: Dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    def predict(self, feature_vector: List[int]):
+        decision_values = self.decision_values(feature_vector)
+
+        # Too close to call? Pairs with no support vector sharing a feature with the
+        # query reduce to their intercept in libsvm too, so are always exact.
+        n = len(feature_vector)
+        bounds = self.gamma * self.gamma * n * n * self._coefficient_bounds + np.abs(self._intercepts)
+        close = np.abs(decision_values) <= self._tie_tolerance * bounds
+        if np.any(close) and np.any(close[self._covered_pairs(feature_vector)]):
+            return None
+
+        # one-vs-one voting, as in libsvm
+        votes = np.zeros(len(self.classes), dtype=np.int32)
+        first, second = self._pairs
+        winners = np.where(decision_values > 0, first, second)
+        np.add.at(votes, winners, 1)
+        return int(self.classes[np.argmax(votes)])
+
+    def decision_values(self, feature_vector: List[int]):
+        rows = self._rows(np.asarray(feature_vector, dtype=np.int64))
+        sums = np.asarray(self._weights[rows].sum(axis=0, dtype=np.float64)).ravel()
+        return self.gamma * self.gamma * sums + self._intercepts
+
+    def save(self, path: Path):
+        weights = self._weights
+        save_arrays(path, MAGIC, VERSION, {
+            'gamma': self.gamma,
+            'feature_count': self.feature_count}, [
+                self.classes,
+                self._keys,
+                weights.data,
+                weights.indices,
+                weights.indptr,
+                self._intercepts,
+                self._coefficient_bounds,
+                self._coverage.indices,
+                self._coverage.indptr])
+
+    @staticmethod
+    def load(path: Path):
+        (manifest, arrays) = load_arrays(path, MAGIC, VERSION)
+        (classes, keys, data, indices, indptr, intercepts, coefficient_bounds,
+         coverage_indices, coverage_indptr) = arrays
+        feature_count = manifest['feature_count']
+
+        # the matrices are built over the mapped arrays, without copying them
+        weights = csr_matrix((data, indices, indptr), shape=(len(keys), len(intercepts)), copy=False)
+        coverage = csr_matrix(
+            (np.ones(len(coverage_indices), dtype=np.bool_), coverage_indices, coverage_indptr),
+            shape=(feature_count, len(intercepts)),
+            copy=False)
+
+        return PrimalModel(
+            classes,
+            manifest['gamma'],
+            feature_count,
+            keys,
+            weights,
+            intercepts,
+            coefficient_bounds,
+            coverage)
+
+    def _covered_pairs(self, feature_vector: List[int]):
+        return np.unique(self._coverage[feature_vector].indices)
+
+    def _rows(self, features: np.ndarray):
+        n = len(features)
+        triangle = self._triangles.get(n)
+        if triangle is None:
+            triangle = np.triu_indices(n)
+            self._triangles[n] = triangle
+
+        # pair keys absent from every support vector have zero weight
+        first, second = triangle
+        query = features[first] * self.feature_count + features[second]
+        rows = np.searchsorted(self._keys, query)
+        rows[rows == len(self._keys)] = 0
+        return rows[self._keys[rows] == query]
+
+
+def compile_primal(model: SVC, dtype: type = np.float32):
+    if model.kernel != 'poly' or model.degree != 2 or model.coef0 != 0:
+        raise ValueError('Only degree 2 homogeneous polynomial kernels can be expanded.')
+
+    support_vectors = csr_matrix(model.support_vectors_)
+    if np.any(support_vectors.data != 1):
+        raise ValueError('Support vectors should be binary.')
+
+    classes = model.classes_
+    feature_count = support_vectors.shape[1]
+    coefficients = _pair_coefficients(model)
+
+    # pair keys of each support vector, with off-diagonal pairs counted twice
+    keys: List[np.ndarray] = []
+    vectors: List[np.ndarray] = []
+    multiplicities: List[np.ndarray] = []
+    for k in range(support_vectors.shape[0]):
+        features = support_vectors.indices[support_vectors.indptr[k]:support_vectors.indptr[k + 1]]
+        features = np.sort(features).astype(np.int64)
+        first, second = np.triu_indices(len(features))
+        keys.append(features[first] * feature_count + features[second])
+        vectors.append(np.full(len(first), k, dtype=np.int64))
+        multiplicities.append(np.where(first == second, 1.0, 2.0))
+
+    unique_keys, rows = np.unique(np.concatenate(keys), return_inverse=True)
+    membership = coo_matrix(
+        (np.concatenate(multiplicities), (rows, np.concatenate(vectors))),
+        shape=(len(unique_keys), support_vectors.shape[0])).tocsr()
+
+    weights = csr_matrix(membership @ coefficients).astype(dtype)
+    weights.sort_indices()
+
+    # class pairs with a support vector containing each feature
+    support = coefficients.copy()
+    support.data = np.ones(len(support.data))
+    coverage = csr_matrix(support_vectors.T @ support, dtype=np.bool_)
+    coverage.sort_indices()
+
+    return PrimalModel(
+        classes,
+        model._gamma,
+        feature_count,
+        unique_keys,
+        weights,
+        libsvm_intercepts(model),
+        np.asarray(abs(coefficients).sum(axis=0)).ravel(),
+        coverage)
+
+
+def compile_model(model_folder: Path, dtype: type = np.float32):
+    for svm_file in sorted(model_folder.glob('*.svm')):
+        model: SVC = joblib.load(svm_file)
+        compile_primal(model, dtype).save(svm_file.with_suffix('.primal'))
+
+
+def class_pairs(class_count: int):
+    first, second = np.triu_indices(class_count, 1)
+    return (first, second)
+
+
+def _pair_coefficients(model: SVC):
+
+    # libsvm stores the coefficient of a support vector of class i in pair (i, j)
+    # at row j - 1, and of class j at row i
+    dual_coef = libsvm_dual_coef(model)
+    n_support = model.n_support_
+    starts = np.concatenate(([0], np.cumsum(n_support)))
+    first, second = class_pairs(len(model.classes_))
+
+    rows: List[np.ndarray] = []
+    columns: List[np.ndarray] = []
+    data: List[np.ndarray] = []
+    for p, (i, j) in enumerate(zip(first, second)):
+        for c, row in ((i, j - 1), (j, i)):
+            vectors = np.arange(starts[c], starts[c + 1])
+            rows.append(vectors)
+            columns.append(np.full(len(vectors), p))
+            data.append(dual_coef[row, vectors])
+
+    coefficients = coo_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(columns))),
+        shape=(starts[-1], len(first))).tocsr()
+    coefficients.eliminate_zeros()
+    return coefficients
+
+
+def libsvm_dual_coef(model: SVC):
+
+    # scikit-learn negates binary coefficients relative to libsvm
+    dual_coef = np.asarray(model.dual_coef_.todense() if hasattr(model.dual_coef_, 'todense') else model.dual_coef_)
+    return -dual_coef if len(model.classes_) == 2 else dual_coef
+
+
+def libsvm_intercepts(model: SVC):
+    intercepts = np.asarray(model.intercept_, dtype=np.float64)
+    return -intercepts if len(model.classes_) == 2 else intercepts
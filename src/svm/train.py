@@ -1,14 +1,18 @@
-from typing import List
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
 from pathlib import Path
 import shutil
 import joblib
 
-from scipy.sparse import lil_matrix
+from scipy.sparse import csr_matrix
 from sklearn.svm import SVC
 import numpy as np
 
 from .ensemble import Ensemble
 from .instance import Instance
+from .feature_layout import FeatureLayout
+from .model import ModelFolder
 from ..lexicography.lemma_service import LemmaService
 from ..syntax.syntax_graph import SyntaxGraph
 from ..parser.parser import Parser
@@ -23,60 +27,138 @@ from ..syntax.syntax_graph import SyntaxGraph
 class SvmProblem:
 
     def __init__(self):
-        self._feature_vectors: List[List[int]] = []
+        self._indices = array('i')
+        self._indptr = array('q', [0])
         self._feature_count: int = 0
-        self._labels: List[int] = []
+        self._labels = array('i')
+        self.graph_indices = array('i')
 
-    def add(self, instance: Instance, action: ParserAction):
-        feature_vector = instance.feature_vector
-        self._feature_vectors.append(feature_vector)
+    def add(self, instance: Instance, action: ParserAction, graph_index: int = 0):
+        self._indices.extend(instance.feature_vector)
+        self._indptr.append(len(self._indices))
         self._feature_count = instance.size
         label = encode_parser_action(action)
         self._labels.append(label)
+        self.graph_indices.append(graph_index)
 
     def build_matrix(self):
-        matrix = lil_matrix((len(self._feature_vectors), self._feature_count))
 
-        for i, feature_vector in enumerate(self._feature_vectors):
-            for j in feature_vector:
-                matrix[i, j] = 1
+        # feature indices are added in increasing order, so rows are already canonical
+        row_count = len(self._labels)
+        indices = np.frombuffer(self._indices, dtype=np.intc).astype(np.int32)
+        indptr = np.frombuffer(self._indptr, dtype=np.int64)
+        data = np.ones(len(indices), dtype=np.float64)
+        matrix = csr_matrix((data, indices, indptr), shape=(row_count, self._feature_count))
+        return (matrix, np.frombuffer(self._labels, dtype=np.intc).astype(np.int64))
 
-        return (matrix, self._labels)
 
+class InstanceStore:
 
-def train(lemma_service: LemmaService, graphs: List[SyntaxGraph], model_folder: Path):
+    def __init__(self, lemma_service: LemmaService, graphs: List[SyntaxGraph]):
+        self._graphs = graphs
+        self._graph_indices: Dict[int, int] = {id(graph): i for i, graph in enumerate(graphs)}
+        self._problems: List[Tuple[csr_matrix, np.ndarray, np.ndarray] | None] = []
+
+        # oracle instances for every graph, with each row tagged by its graph
+        for problem in _build_svm_problems(lemma_service, graphs):
+            if problem is None:
+                self._problems.append(None)
+                continue
+
+            matrix, labels = problem.build_matrix()
+            self._problems.append((matrix, labels, np.frombuffer(problem.graph_indices, dtype=np.intc)))
+
+    def problems(self, graphs: List[SyntaxGraph]):
+
+        # position of each store graph in the subset
+        positions = np.full(len(self._graphs), -1)
+        for position, graph in enumerate(graphs):
+            graph_index = self._graph_indices.get(id(graph))
+            if graph_index is None:
+                raise ValueError('Graph not in instance store.')
+            positions[graph_index] = position
+
+        # slice rows, in the same order as building from the subset directly
+        problems: List[Tuple[csr_matrix, np.ndarray] | None] = []
+        for problem in self._problems:
+            if problem is None:
+                problems.append(None)
+                continue
+
+            matrix, labels, graph_indices = problem
+            row_positions = positions[graph_indices]
+            rows = np.flatnonzero(row_positions >= 0)
+            if rows.size == 0:
+                problems.append(None)
+                continue
+
+            rows = rows[np.argsort(row_positions[rows], kind='stable')]
+            problems.append((matrix[rows], labels[rows]))
+
+        return problems
+
+
+def train(
+        lemma_service: LemmaService,
+        graphs: List[SyntaxGraph],
+        model_folder: Path,
+        workers: int = 1,
+        store: InstanceStore | None = None):
 
     # recreate model folder
     if model_folder.exists():
         shutil.rmtree(model_folder)
     model_folder.mkdir()
 
-    print('Preparing training data...')
-    problems = _build_svm_problems(lemma_service, graphs)
+    # record the feature layout, so models can't be used with a different vocabulary
+    layout = FeatureLayout.for_lemma_service(lemma_service)
+    with open(model_folder / ModelFolder.LAYOUT_FILE, 'w') as f:
+        f.write(layout.to_json())
 
-    # train models
+    # training instances are sliced from the store, if it was built beforehand
+    if store is None:
+        print('Preparing training data...')
+        store = InstanceStore(lemma_service, graphs)
+    problems = store.problems(graphs)
+
+    # constant models
+    fits: List[Tuple[int, csr_matrix, np.ndarray]] = []
     for i, problem in enumerate(problems):
         if problem is None:
             continue
 
-        matrix, labels = problem.build_matrix()
-        filename = f'{i:02d}'
-
+        matrix, labels = problem
         if np.unique(labels).size == 1:
-            with open(model_folder / f'{filename}.txt', 'w') as f:
+            with open(model_folder / f'{i:02d}.txt', 'w') as f:
                 f.write(str(labels[0]))
         else:
-            print(f'Training model {i}')
-            model = SVC(C=0.5, kernel='poly', degree=2, gamma=0.2, coef0=0)
-            model.fit(matrix, labels)
-            joblib.dump(model, model_folder / f'{filename}.svm')
+            fits.append((i, matrix, labels))
+
+    # train models, largest problem first so it isn't left until last
+    fits.sort(key=lambda fit: fit[1].shape[0], reverse=True)
+    if workers <= 1:
+        for i, matrix, labels in fits:
+            _train_model(i, matrix, labels, model_folder)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_train_model, i, matrix, labels, model_folder) for i, matrix, labels in fits]
+        for future in futures:
+            future.result()
+
+
+def _train_model(i: int, matrix: csr_matrix, labels: np.ndarray, model_folder: Path):
+    print(f'Training model {i}')
+    model = SVC(C=0.5, kernel='poly', degree=2, gamma=0.2, coef0=0)
+    model.fit(matrix, labels)
+    joblib.dump(model, model_folder / f'{i:02d}.svm')
 
 
 def _build_svm_problems(lemma_service: LemmaService, graphs: List[SyntaxGraph]):
     problems: List[SvmProblem | None] = [None]*Ensemble.ENSEMBLE_COUNT
 
     # parse each graph
-    for expected_graph in graphs:
+    for graph_index, expected_graph in enumerate(graphs):
 
         # apply expected actions
         actions = Oracle(expected_graph, expected_graph.only_tokens()).expected_actions()
@@ -85,11 +167,11 @@ def _build_svm_problems(lemma_service: LemmaService, graphs: List[SyntaxGraph]):
         stack = parser.stack
         queue = parser.queue
         for action in actions:
-            _add_instance(problems, lemma_service, output_graph, stack, queue, action)
+            _add_instance(problems, lemma_service, output_graph, stack, queue, action, graph_index)
             parser.execute(action)
 
         # stop parsing
-        _add_instance(problems, lemma_service, output_graph, stack, queue, None)
+        _add_instance(problems, lemma_service, output_graph, stack, queue, None, graph_index)
 
     return problems
 
@@ -99,7 +181,8 @@ def _add_instance(problems: List[SvmProblem],
                   graph: SyntaxGraph,
                   stack: Stack,
                   queue: Queue,
-                  action: ParserAction | None):
+                  action: ParserAction | None,
+                  graph_index: int):
 
     classifier_index = Ensemble.classifier_index(stack.node(0))
 
@@ -107,4 +190,4 @@ def _add_instance(problems: List[SvmProblem],
         problems[classifier_index] = SvmProblem()
 
     instance = Instance.instance(lemma_service, graph, stack, queue)
-    problems[classifier_index].add(instance, action)
+    problems[classifier_index].add(instance, action, graph_index)
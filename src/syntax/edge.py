@@ -4,11 +4,18 @@ from .syntax_node import SyntaxNode
 from .relation import Relation
 
 
-@dataclass
+@dataclass(slots=True)
 class Edge:
     dependent: SyntaxNode
     head: SyntaxNode
     relation: Relation
 
+    @property
+    def key(self):
+        return (self.dependent.key, self.head.key, self.relation)
+
+    def __hash__(self):
+        return hash(self.key)
+
     def __str__(self):
         return f'{self.relation.tag}: {self.dependent} -> {self.head}'
@@ -0,0 +1,57 @@
+from typing import Dict, List, Tuple
+
+from .syntax_node import SyntaxNode
+from .syntax_graph import SyntaxGraph
+
+
+# Maps nodes of an output graph to the equal nodes of an expected graph, using
+# the structural keys of the expected graph's nodes.
+class GraphAlignment:
+
+    def __init__(self, expected_graph: SyntaxGraph):
+        self._node_map: Dict[int, SyntaxNode] = {}
+        self._phrases = _key_index(expected_graph.phrases)
+        self._segment_nodes = _key_index(expected_graph.segment_nodes)
+
+    def add(self, output_node: SyntaxNode, expected_node: SyntaxNode):
+        self._node_map[id(output_node)] = expected_node
+
+    def expected_node(self, output_node: SyntaxNode):
+
+        # mapped?
+        expected_node = self._node_map.get(id(output_node))
+        if expected_node is not None:
+            return expected_node
+
+        key = output_node.key
+
+        # phrase
+        if output_node.is_phrase:
+            for node in self._phrases.get(key, []):
+                if node == output_node:
+                    self._node_map[id(output_node)] = node
+                    return node
+
+        # segment, closest to the output node's position
+        match: SyntaxNode | None = None
+        for node in self._segment_nodes.get(key, []):
+            if node == output_node:
+                if match is None:
+                    match = node
+                    continue
+                d1 = abs(output_node.index - node.index)
+                d2 = abs(output_node.index - match.index)
+                if d1 < d2:
+                    match = node
+
+        if match is not None:
+            self._node_map[id(output_node)] = match
+            return match
+        return None
+
+
+def _key_index(nodes: List[SyntaxNode]):
+    index: Dict[Tuple, List[SyntaxNode]] = {}
+    for node in nodes:
+        index.setdefault(node.key, []).append(node)
+    return index
@@ -36,7 +36,7 @@ class PhraseClassifier:
         predicate = False
 
         # look for edges that are directly covered by the phrase
-        for edge in graph.edges:
+        for edge in PhraseClassifier._covered_edges(graph, start, end):
             if PhraseClassifier._is_minimum_covering_phrase_for_edge(graph, start, end, edge):
                 relation = edge.relation
                 if relation == Relation.GENITIVE:
@@ -80,25 +80,19 @@ class PhraseClassifier:
         return PhraseType.SENTENCE
 
     def _minimum_covering_phrase(graph: SyntaxGraph, segment_node: SyntaxNode):
-        index = segment_node.index
-        minimum_covering_phrase: SyntaxNode | None = None
-        minimum_covering_start = 0
-        minimum_covering_end = 0
+        return graph.minimum_covering_phrase(segment_node)
 
-        for phrase in graph.phrases:
-
-            # covering
-            start = phrase.start.index
-            end = phrase.end.index
-            if index >= start and index <= end:
-
-                # minimum?
-                if minimum_covering_phrase is None or end - start < minimum_covering_end - minimum_covering_start:
-                    minimum_covering_phrase = phrase
-                    minimum_covering_start = start
-                    minimum_covering_end = end
-
-        return minimum_covering_phrase
+    # edges with a head inside the phrase, either a segment or a sub-phrase
+    def _covered_edges(graph: SyntaxGraph, start: SyntaxNode, end: SyntaxNode):
+        edges: List[Edge] = []
+        end_index = end.index
+        for i in range(start.index, end_index + 1):
+            segment_node = graph.segment_nodes[i]
+            edges.extend(graph.dependents(segment_node))
+            for phrase in graph.phrases_starting_at(segment_node):
+                if phrase.end.index <= end_index:
+                    edges.extend(graph.dependents(phrase))
+        return edges
 
     def _is_minimum_covering_phrase_for_edge(graph: SyntaxGraph, start: SyntaxNode, end: SyntaxNode, edge: Edge):
         return (PhraseClassifier._is_minimum_covering_phrase_for_node(graph, start, end, edge.head)
@@ -63,3 +63,12 @@ Relation.tags = {
 }
 
 Relation.relations = list(Relation)
+
+
+def relation_bit(relation: Relation):
+    return 1 << (relation.value[0] - 1)
+
+
+SUBJECT_RELATIONS = (relation_bit(Relation.SUBJECT)
+                     | relation_bit(Relation.PASSIVE_SUBJECT)
+                     | relation_bit(Relation.SPECIAL_SUBJECT))
@@ -1,69 +1,142 @@
+from typing import Dict
+import weakref
+
 from .syntax_graph import SyntaxGraph
 from .syntax_node import SyntaxNode
 from ..morphology.part_of_speech import PartOfSpeech
 
 
 def subgraph_end(graph: SyntaxGraph, node: SyntaxNode):
+    index = SubgraphIndex._indexes.get(graph)
+    if index is None:
+        index = SubgraphIndex()
+        SubgraphIndex._indexes[graph] = index
+    return index.end(graph, node)
+
+
+# Subgraph ends of a graph, cached until the graph changes. The leftward head of each
+# node is kept across changes, except for the nodes touched by new edges, so each step
+# only walks the parts of the dependency chains it has not seen.
+class SubgraphIndex:
+
+    _indexes: 'weakref.WeakKeyDictionary[SyntaxGraph, SubgraphIndex]' = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self.version = -1
+        self._edge_count = 0
+        self._segment_node_count = 0
+        self._heads: Dict[int, SyntaxNode | None] = {}
+        self._ends: Dict[int, SyntaxNode | None] = {}
+
+    def end(self, graph: SyntaxGraph, node: SyntaxNode):
+        self._update(graph)
+        key = id(node)
+        if key not in self._ends:
+            self._ends[key] = self._find_end(graph, node)
+        return self._ends[key]
+
+    def _update(self, graph: SyntaxGraph):
+        if graph.version == self.version:
+            return
+
+        # inserted nodes move every position, new edges only their own nodes
+        self._ends.clear()
+        if len(graph.segment_nodes) != self._segment_node_count:
+            self._heads.clear()
+        else:
+            for edge in graph.edges[self._edge_count:]:
+                dependent = edge.dependent
+                self._heads.pop(id(dependent.start if dependent.is_phrase else dependent), None)
+                self._heads.pop(id(edge.head), None)
+
+        self.version = graph.version
+        self._edge_count = len(graph.edges)
+        self._segment_node_count = len(graph.segment_nodes)
+
+    def _find_end(self, graph: SyntaxGraph, node: SyntaxNode):
+
+        if node.is_phrase:
+            return None
+
+        # Whether each node's chain reaches the start node. Chains only move left, so
+        # a chain that passes the start node never reaches it.
+        reaches: Dict[int, bool] = {id(node): True}
+
+        # test each node from left to right
+        segment_nodes = graph.segment_nodes
+        for i in range(len(segment_nodes) - 1, node.index, -1):
+
+            # the node to test
+            end = segment_nodes[i]
+
+            # walk the dependency chain, looking for rightwards dependencies
+            path = []
+            start = end
+            while True:
+                if start is None or start.index < node.index:
+                    result = False
+                    break
+                result = reaches.get(id(start))
+                if result is not None:
+                    break
+                path.append(start)
+                start = self._head(graph, start)
+
+            for start in path:
+                reaches[id(start)] = result
+            if result:
+                return end
 
-    if node.is_phrase:
         return None
 
-    # test each node from left to right
-    segment_nodes = graph.segment_nodes
-    for i in range(len(segment_nodes) - 1, node.index, -1):
-
-        # the node to test
-        end = segment_nodes[i]
-
-        # walk the dependency chain, looking for rightwards dependencies
-        start = end
-        while start and start is not node:
-            head = graph.head(start)
-
-            if head and head.is_phrase:
-                head = head.start
-
-            # leftwards head
-            if head and head.index >= start.index:
-                head = None
-
-            # if no head, check if we are at the start of a phrase
-            if head is None:
-                for phrase in graph.phrases:
-                    if phrase.start is start:
-
-                        phrase_head = graph.head(phrase)
-                        if phrase_head and not phrase_head.is_phrase and phrase_head.index < start.index:
-                            head = phrase_head
-                            break
-
-            # if no head, check incoming edges
-            if head is None:
-                for edge in graph.edges:
-                    if edge.head is start:
-                        dependent = edge.dependent
-                        if dependent.is_phrase:
-                            if dependent.start.index < start.index:
-                                head = dependent.start
-                        else:
-                            if dependent.index < start.index:
-                                head = dependent
-
-            # disconnected POS:VOC, POS:PREV
-            if head is None:
-                previous = graph.previous_segment_node(start)
-                if previous:
-                    part_of_speech = previous.part_of_speech
-                    if part_of_speech == PartOfSpeech.VOCATIVE or part_of_speech == PartOfSpeech.PREVENTIVE:
-                        head = previous
-
-            # disconnected POS:EXP
-            if head is None and start.part_of_speech == PartOfSpeech.EXCEPTIVE:
-                head = graph.previous_segment_node(start)
-
-            start = head
-
-        if start is node:
-            return end
-
-    return None
+    def _head(self, graph: SyntaxGraph, start: SyntaxNode):
+        key = id(start)
+        if key in self._heads:
+            return self._heads[key]
+        head = _leftward_head(graph, start)
+        self._heads[key] = head
+        return head
+
+
+def _leftward_head(graph: SyntaxGraph, start: SyntaxNode):
+    head = graph.head(start)
+
+    if head and head.is_phrase:
+        head = head.start
+
+    # leftwards head
+    if head and head.index >= start.index:
+        head = None
+
+    # if no head, check if we are at the start of a phrase
+    if head is None:
+        for phrase in graph.phrases_starting_at(start):
+            phrase_head = graph.head(phrase)
+            if phrase_head and not phrase_head.is_phrase and phrase_head.index < start.index:
+                head = phrase_head
+                break
+
+    # if no head, check incoming edges
+    if head is None:
+        for edge in graph.dependents(start):
+            dependent = edge.dependent
+            if dependent.is_phrase:
+                if dependent.start.index < start.index:
+                    head = dependent.start
+            else:
+                if dependent.index < start.index:
+                    head = dependent
+
+    # disconnected POS:VOC, POS:PREV
+    if head is None:
+        previous = graph.previous_segment_node(start)
+        if previous:
+            part_of_speech = previous.part_of_speech
+            if part_of_speech == PartOfSpeech.VOCATIVE or part_of_speech == PartOfSpeech.PREVENTIVE:
+                head = previous
+
+    # disconnected POS:EXP
+    if head is None and start.part_of_speech == PartOfSpeech.EXCEPTIVE:
+        head = graph.previous_segment_node(start)
+
+    return head
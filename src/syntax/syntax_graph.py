@@ -1,11 +1,11 @@
-from typing import List
+from typing import Dict, List, Tuple
 
 from .syntax_node import SyntaxNode
 from .word import Word
 from .word_type import WordType
 from .phrase_type import PhraseType
 from .edge import Edge
-from .relation import Relation
+from .relation import Relation, relation_bit
 from ..orthography.token import Token
 from ..morphology.part_of_speech import PartOfSpeech
 
@@ -18,11 +18,30 @@ class SyntaxGraph:
         self.phrases: List[SyntaxNode] = []
         self.edges: List[Edge] = []
 
+        # bumped on each mutation, for caches over the graph
+        self.version = 0
+
+        # edge indexes, by node identity
+        self._head_edges: Dict[int, Edge] = {}
+        self._dependent_edges: Dict[int, List[Edge]] = {}
+        self._pair_edges: Dict[Tuple[int, int], Edge] = {}
+        self._dependent_relations: Dict[int, int] = {}
+        self._key_edges: Dict[Tuple, List[Edge]] = {}
+
+        # phrase indexes, by node identity
+        self._span_phrases: Dict[Tuple[int, int], SyntaxNode] = {}
+        self._start_phrases: Dict[int, List[SyntaxNode]] = {}
+
+        # minimum covering phrase of each segment node, rebuilt after insertions
+        self._covering_phrases: List[SyntaxNode | None] | None = []
+
+        # word positions and segment nodes, by word identity
+        self._word_indexes: Dict[int, int] = {}
+        self._word_nodes: Dict[int, List[SyntaxNode]] = {}
+
     def word_index(self, node: SyntaxNode):
         if not node.is_phrase:
-            for i, word in enumerate(self.words):
-                if word is node.word:
-                    return i
+            return self._word_indexes.get(id(node.word), -1)
         return -1
 
     def add_word(
@@ -32,46 +51,58 @@ class SyntaxGraph:
             elided_text: str | None,
             elided_part_of_speech: PartOfSpeech | None):
 
-        word = Word(word_type, token, elided_text, elided_part_of_speech)
+        word = self._new_word(word_type, token, elided_text, elided_part_of_speech)
+        self._word_indexes[id(word)] = len(self.words)
         self.words.append(word)
+        self.version += 1
 
-        index = len(self.segment_nodes)
-        if word_type == WordType.ELIDED:
-            node = SyntaxNode()
-            node.word = word
-            node.index = index
+        for node in self._word_nodes[id(word)]:
+            node.index = len(self.segment_nodes)
             self.segment_nodes.append(node)
-        else:
-            for segment in token.segments:
-                if segment.part_of_speech != PartOfSpeech.DETERMINER:
-                    node = SyntaxNode()
-                    node.word = word
-                    node.segment_number = segment.segment_number
-                    node.index = index
-                    self.segment_nodes.append(node)
-                    index += 1
+            if self._covering_phrases is not None:
+                self._covering_phrases.append(None)
 
     def insert_elided_word(
             self,
             word_index: int,
             part_of_speech: PartOfSpeech,
             text: str):
+        return self.insert_elided_words([(word_index, part_of_speech, text)])[0]
 
-        # node
-        self.add_word(WordType.ELIDED, None, text, part_of_speech)
-        elided_node_index = self._segment_node_index(self.words[word_index])
-        segment_node_count = len(self.segment_nodes)
-        elided_node = self.segment_nodes.pop()
-        self.segment_nodes.insert(elided_node_index, elided_node)
+    # Inserts several elided words in one pass. Word indexes refer to the graph before
+    # insertion. Words inserted at the same index end up in reverse order, as they
+    # would with repeated calls to insert_elided_word.
+    def insert_elided_words(self, insertions: List[Tuple[int, PartOfSpeech, str | None]]):
+        word_count = len(self.words)
+        inserted: Dict[int, List[Word]] = {}
+        elided_nodes: List[SyntaxNode] = []
+        for word_index, part_of_speech, text in insertions:
+            if word_index < 0 or word_index > word_count:
+                raise IndexError(f'Word index out of range: {word_index}')
+            word = self._new_word(WordType.ELIDED, None, text, part_of_speech)
+            inserted.setdefault(word_index, []).insert(0, word)
+            elided_nodes.append(self._word_nodes[id(word)][0])
+        if not inserted:
+            return elided_nodes
 
-        # word
-        elided_word = self.words.pop()
-        self.words.insert(word_index, elided_word)
+        # rebuild the lists from the first insertion, then reindex
+        first = min(inserted)
+        node_start = self._segment_node_index(self.words[first]) if first < word_count else len(self.segment_nodes)
+        words: List[Word] = []
+        for i in range(first, word_count + 1):
+            words.extend(inserted.get(i, ()))
+            if i < word_count:
+                words.append(self.words[i])
 
-        # reindex
-        for i in range(segment_node_count):
+        self.words[first:] = words
+        self.segment_nodes[node_start:] = [node for word in words for node in self._word_nodes[id(word)]]
+        for i in range(first, len(self.words)):
+            self._word_indexes[id(self.words[i])] = i
+        for i in range(node_start, len(self.segment_nodes)):
             self.segment_nodes[i].index = i
-        return elided_node
+        self._covering_phrases = None
+        self.version += 1
+        return elided_nodes
 
     def previous_segment_node(self, node: SyntaxNode):
         index = node.index
@@ -93,13 +124,25 @@ class SyntaxGraph:
         node.end = end
         node.index = len(self.segment_nodes) + len(self.phrases)
         self.phrases.append(node)
+        self._index_phrase(node)
+        if self._covering_phrases is not None:
+            self._cover(node)
+        self.version += 1
         return node
 
     def phrase(self, start: SyntaxNode, end: SyntaxNode):
-        for phrase in self.phrases:
-            if phrase.start is start and phrase.end is end:
-                return phrase
-        return None
+        return self._span_phrases.get((id(start), id(end)))
+
+    def phrases_starting_at(self, start: SyntaxNode) -> List[SyntaxNode]:
+        return self._start_phrases.get(id(start), [])
+
+    # The smallest phrase covering a segment node, or the first added for a tie.
+    def minimum_covering_phrase(self, node: SyntaxNode):
+        if self._covering_phrases is None:
+            self._covering_phrases = [None] * len(self.segment_nodes)
+            for phrase in self.phrases:
+                self._cover(phrase)
+        return self._covering_phrases[node.index]
 
     def is_cyclic_dependency(self, dependent: SyntaxNode, head: SyntaxNode):
         node = head
@@ -113,22 +156,35 @@ class SyntaxGraph:
             raise RuntimeError('Duplicate head node.')
         if self.is_cyclic_dependency(dependent, head):
             raise RuntimeError('Cyclic dependency.')
-        self.edges.append(Edge(dependent, head, relation))
+
+        edge = Edge(dependent, head, relation)
+        self.edges.append(edge)
+        self._index_edge(edge)
+        self.version += 1
+
+    def dependents(self, head: SyntaxNode) -> List[Edge]:
+        return self._dependent_edges.get(id(head), [])
+
+    # number of edges incident to the node
+    def degree(self, node: SyntaxNode):
+        edge = self._head_edges.get(id(node))
+        return len(self.dependents(node)) + (1 if edge is not None and edge.head is not node else 0)
+
+    def dependent_relations(self, head: SyntaxNode):
+        return self._dependent_relations.get(id(head), 0)
+
+    def has_dependent(self, head: SyntaxNode, relation: Relation):
+        return self.dependent_relations(head) & relation_bit(relation) != 0
 
     def edge(self, node1: SyntaxNode, node2: SyntaxNode):
-        for edge in self.edges:
-            if (edge.dependent is node1 and edge.head is node2) or (edge.head is node1 and edge.dependent is node2):
-                return edge
-        return None
+        return self._pair_edges.get(_pair_key(node1, node2))
 
     def head(self, dependent: SyntaxNode):
-        for edge in self.edges:
-            if edge.dependent is dependent:
-                return edge.head
-        return None
+        edge = self._head_edges.get(id(dependent))
+        return edge.head if edge is not None else None
 
     def contains_edge(self, edge: Edge):
-        return edge in self.edges
+        return any(key_edge == edge for key_edge in self._key_edges.get(edge.key, []))
 
     def only_tokens(self):
         graph = SyntaxGraph()
@@ -144,8 +200,90 @@ class SyntaxGraph:
                 return word.token.location
         raise ValueError
 
+    # indexes are keyed by object identity, so they are rebuilt when unpickled
+    def __getstate__(self):
+        return {
+            'words': self.words,
+            'segment_nodes': self.segment_nodes,
+            'phrases': self.phrases,
+            'edges': self.edges,
+            'version': self.version}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.words = state['words']
+        self.segment_nodes = state['segment_nodes']
+        self.phrases = state['phrases']
+        self.edges = state['edges']
+        self.version = state['version']
+
+        for i, word in enumerate(self.words):
+            self._word_indexes[id(word)] = i
+            self._word_nodes[id(word)] = []
+        for node in self.segment_nodes:
+            self._word_nodes[id(node.word)].append(node)
+        for phrase in self.phrases:
+            self._index_phrase(phrase)
+        for edge in self.edges:
+            self._index_edge(edge)
+        self._covering_phrases = None
+
+    def _index_phrase(self, phrase: SyntaxNode):
+        self._span_phrases.setdefault((id(phrase.start), id(phrase.end)), phrase)
+        self._start_phrases.setdefault(id(phrase.start), []).append(phrase)
+
+    def _index_edge(self, edge: Edge):
+        dependent = edge.dependent
+        head = edge.head
+        self._head_edges[id(dependent)] = edge
+        self._dependent_edges.setdefault(id(head), []).append(edge)
+        self._pair_edges[_pair_key(dependent, head)] = edge
+        self._key_edges.setdefault(edge.key, []).append(edge)
+        self._dependent_relations[id(head)] = self._dependent_relations.get(id(head), 0) | relation_bit(edge.relation)
+
+    def _cover(self, phrase: SyntaxNode):
+        start = phrase.start.index
+        end = phrase.end.index
+        for i in range(start, end + 1):
+            covering_phrase = self._covering_phrases[i]
+            if covering_phrase is None or end - start < covering_phrase.end.index - covering_phrase.start.index:
+                self._covering_phrases[i] = phrase
+
+    def _new_word(
+            self,
+            word_type: WordType,
+            token: Token | None,
+            elided_text: str | None,
+            elided_part_of_speech: PartOfSpeech | None):
+
+        word = Word(word_type, token, elided_text, elided_part_of_speech)
+        nodes: List[SyntaxNode] = []
+        if word_type == WordType.ELIDED:
+            node = SyntaxNode()
+            node.word = word
+            nodes.append(node)
+        else:
+            for segment in token.segments:
+                if segment.part_of_speech != PartOfSpeech.DETERMINER:
+                    node = SyntaxNode()
+                    node.word = word
+                    node.segment_number = segment.segment_number
+                    nodes.append(node)
+        self._word_nodes[id(word)] = nodes
+        return word
+
     def _segment_node_index(self, word: Word):
-        for i in range(len(self.segment_nodes)):
-            if self.segment_nodes[i].word is word:
-                return i
-        raise ValueError
+
+        # words without segment nodes start where the next word starts
+        index = self._word_indexes[id(word)]
+        for i in range(index, len(self.words)):
+            nodes = self._word_nodes[id(self.words[i])]
+            if nodes:
+                return nodes[0].index
+        return len(self.segment_nodes)
+
+
+def _pair_key(node1: SyntaxNode, node2: SyntaxNode):
+    key1 = id(node1)
+    key2 = id(node2)
+    return (key1, key2) if key1 < key2 else (key2, key1)
@@ -5,6 +5,7 @@ from ..morphology.segment import Segment
 
 
 class SyntaxNode:
+    __slots__ = ('word', 'segment_number', 'phrase_type', 'start', 'end', 'index')
 
     def __init__(self):
         self.word: Word | None = None
@@ -28,6 +29,20 @@ class SyntaxNode:
     def segment(self):
         return None if self.word is None or self.word.type == WordType.ELIDED else self.word.token.segment(self.segment_number)
 
+    # Structural key, equal for equal nodes. Segments are keyed by location rather
+    # than identity, so keys are stable across copies of the same tokens.
+    @property
+    def key(self):
+        if self.phrase_type is not None:
+            return (self.phrase_type, self.start.key, self.end.key)
+
+        word = self.word
+        if word.type == WordType.ELIDED:
+            return (word.type, word.elided_part_of_speech, word.elided_text)
+
+        location = word.token.location
+        return (word.type, location.chapter_number, location.verse_number, location.token_number, self.segment_number)
+
     def __eq__(self, other: 'SyntaxNode'):
 
         if self.phrase_type != other.phrase_type:
@@ -45,5 +60,8 @@ class SyntaxNode:
 
         return self.segment is other.segment
 
+    def __hash__(self):
+        return hash(self.key)
+
     def __str__(self):
         return self.phrase_type.tag if self.is_phrase else self.part_of_speech.tag
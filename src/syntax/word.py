@@ -5,7 +5,7 @@ from ..orthography.token import Token
 from ..morphology.part_of_speech import PartOfSpeech
 
 
-@dataclass
+@dataclass(slots=True)
 class Word:
     type: WordType
     token: Token
@@ -0,0 +1,29 @@
+import tracemalloc
+
+from src.api.corpus_client import CorpusClient
+from src.lexicography.lemma_service import LemmaService
+from src.morphology.morphology_service import MorphologyService
+from src.syntax.syntax_service import SyntaxService
+
+
+# Reports the memory held by the morphology and syntax services, per token and
+# per graph. Run from the repository root: python tests/memory_benchmark.py
+def memory_benchmark():
+    client = CorpusClient()
+    lemma_service = LemmaService()
+
+    tracemalloc.start()
+    morphology_service = MorphologyService(client, lemma_service)
+    morphology_bytes = tracemalloc.get_traced_memory()[0]
+    syntax_service = SyntaxService(client, morphology_service)
+    syntax_bytes = tracemalloc.get_traced_memory()[0] - morphology_bytes
+    tracemalloc.stop()
+
+    token_count = morphology_service.token_count
+    graph_count = len(syntax_service.graphs)
+    print(f'Tokens: {token_count}, {morphology_bytes / token_count:.0f} bytes per token')
+    print(f'Graphs: {graph_count}, {syntax_bytes / graph_count:.0f} bytes per graph')
+
+
+if __name__ == '__main__':
+    memory_benchmark()
@@ -1,65 +1,320 @@
 from pathlib import Path
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
+
+import numpy as np
 
-from elas import Elas
 from split_treebank import split_treebank
+from src.api.corpus_client import CorpusClient
 from src.container import Container
+from src.lexicography.lemma_service import LemmaService
+from src.morphology.morphology_service import MorphologyService
+from src.morphology.columnar_morphology_service import ColumnarMorphologyService
+from src.orthography.token import Token
 from src.parser.oracle import Oracle
 from src.parser.parser import Parser
-from src.svm.train import train
-from src.svm.model import load_model
+from src.parser.batch_parser import BatchParser
+from src.parser.corpus_parser import parse_corpus
+from src.parser.evaluation import EdgeScore, Evaluation
+from src.svm.train import train, InstanceStore
+from src.svm.ensemble import Ensemble
+from src.svm.feature_layout import FeatureLayout
+from src.svm.model import DecisionCache, ModelFolder, SvmModel, load_model
+from src.svm.compact_model import export_compact_model, load_compact_model
+from src.svm.primal import compile_model
+from src.syntax.syntax_graph import SyntaxGraph
 
 
 class ParserTest(unittest.TestCase):
     MODEL_FOLDER = Path('.model')
+    FOLD_MODEL_FOLDER = Path('.fold_model')
+    PRIMAL_MODEL_FOLDER = Path('.primal_model')
+    COMPACT_MODEL_FILE = Path('.model.qsvm')
+    _fold_model_trained = False
 
     def setUp(self):
         self.container = Container()
-        self.elas = Elas()
+        self.evaluation = Evaluation()
 
     def test_oracle(self):
-        for expected_graph in self.container.syntax_service.graphs:
+        half_evaluations = [Evaluation(), Evaluation()]
+        for i, expected_graph in enumerate(self.container.syntax_service.graphs):
 
             output_graph = expected_graph.only_tokens()
             oracle = Oracle(expected_graph, output_graph)
             oracle.expected_actions()
 
-            self.elas.compare(expected_graph, output_graph)
+            self.evaluation.compare(expected_graph, output_graph)
+            half_evaluations[i % 2].compare(expected_graph, output_graph)
 
             # all output edges should be expected
             for output_edge in output_graph.edges:
                 self.assertEqual(expected_graph.contains_edge(output_edge), True)
 
-        self.assertEqual(self.elas.precision, 1.0)
-        self.assertEqual(self.elas.recall, 0.945793687759221)
+        self.assertEqual(self.evaluation.precision, 1.0)
+        self.assertEqual(self.evaluation.recall, 0.945793687759221)
+
+        # every edge has a relation, but phrase dependents have no part of speech
+        score = self._counts(self.evaluation.score)
+        relation_scores = [self._counts(score) for score in self.evaluation.relations.values()]
+        part_of_speech_scores = [self._counts(score) for score in self.evaluation.parts_of_speech.values()]
+        self.assertEqual(tuple(map(sum, zip(*relation_scores))), score)
+        for count, total in zip(map(sum, zip(*part_of_speech_scores)), score):
+            self.assertLessEqual(count, total)
+
+        # evaluations of parts of the corpus should merge to the evaluation of the whole
+        merged_evaluation = Evaluation()
+        for half_evaluation in half_evaluations:
+            merged_evaluation.merge(half_evaluation)
+        self.assertEqual(self._evaluation_counts(merged_evaluation), self._evaluation_counts(self.evaluation))
 
     def test_ten_fold_cross_validation(self):
+        print('Preparing training data...')
+        store = InstanceStore(self.container.lemma_service, self.container.syntax_service.graphs)
         for fold in range(10):
-            self._train_and_test(fold)
+            self._train_and_test(fold, store)
+
+    def test_primal_model(self):
+        test_graphs = self._fold_model()
+        lemma_service = self.container.lemma_service
+        svm_model = load_model(self.FOLD_MODEL_FOLDER, lemma_service=lemma_service)
+        bit_model = load_model(self.FOLD_MODEL_FOLDER, bit_packed=True, lemma_service=lemma_service)
+
+        export_compact_model(self.FOLD_MODEL_FOLDER, self.COMPACT_MODEL_FILE, dtype=np.float64)
+        compact_model = load_compact_model(self.COMPACT_MODEL_FILE, lemma_service)
+
+        # expanded from a copy, so the shared fold model is left as trained
+        if self.PRIMAL_MODEL_FOLDER.exists():
+            shutil.rmtree(self.PRIMAL_MODEL_FOLDER)
+        shutil.copytree(self.FOLD_MODEL_FOLDER, self.PRIMAL_MODEL_FOLDER)
+        compile_model(self.PRIMAL_MODEL_FOLDER)
+        primal_model = load_model(self.PRIMAL_MODEL_FOLDER, lemma_service=lemma_service)
+
+        # a compact model file should hold the bit-packed members exactly
+        for i in range(Ensemble.ENSEMBLE_COUNT):
+            self._assert_same_member(compact_model._svm_model(i), bit_model._svm_model(i))
+
+        # the expanded, bit-packed and compact models should make exactly the same decisions
+        for expected_graph in test_graphs:
+            svm_edges = self._edges(self._parse(svm_model, expected_graph))
+            self.assertEqual(self._edges(self._parse(primal_model, expected_graph)), svm_edges)
+            self.assertEqual(self._edges(self._parse(bit_model, expected_graph)), svm_edges)
+            self.assertEqual(self._edges(self._parse(compact_model, expected_graph)), svm_edges)
+
+    def test_batch_parser(self):
+        test_graphs = self._fold_model()
+        lemma_service = self.container.lemma_service
+        model = load_model(self.FOLD_MODEL_FOLDER, lemma_service=lemma_service)
+
+        # batch parsing should build the same graphs as sequential parsing
+        output_graphs = [expected_graph.only_tokens() for expected_graph in test_graphs]
+        BatchParser(model, lemma_service, output_graphs).parse()
+        for expected_graph, output_graph in zip(test_graphs, output_graphs):
+            self.assertEqual(self._edges(output_graph), self._edges(self._parse(model, expected_graph)))
 
-    def _train_and_test(self, fold: int):
+    def test_decision_cache(self):
+        with self.assertRaises(ValueError):
+            DecisionCache(0)
+
+        # the least recently used decision is evicted at capacity
+        keys = [(0, 100, (i, i + 1)) for i in range(4)]
+        cache = DecisionCache(2)
+        cache.put(keys[0], 1)
+        cache.put(keys[1], 2)
+        self.assertEqual(cache.get(keys[0]), 1)
+        cache.put(keys[2], 3)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[2]), 3)
+        self.assertEqual((cache.size, cache.hits, cache.misses), (2, 2, 1))
+
+        # saved decisions are only loaded for the same model, in the same order
+        with tempfile.TemporaryDirectory() as folder:
+            cache_file = Path(folder) / 'decisions.cache'
+            self.assertEqual(DecisionCache.load(cache_file, 'model', 2).size, 0)
+            cache.save(cache_file, 'model')
+            self.assertEqual(DecisionCache.load(cache_file, 'other model', 2).size, 0)
+            loaded_cache = DecisionCache.load(cache_file, 'model', 2)
+
+        loaded_cache.put(keys[3], 4)
+        self.assertIsNone(loaded_cache.get(keys[0]))
+        self.assertEqual(loaded_cache.get(keys[2]), 3)
+        self.assertEqual(loaded_cache.get(keys[3]), 4)
+
+    def test_cached_model(self):
+        test_graphs = self._fold_model()
+        lemma_service = self.container.lemma_service
+        model = load_model(self.FOLD_MODEL_FOLDER, lemma_service=lemma_service)
+        cached_model = load_model(self.FOLD_MODEL_FOLDER, lemma_service=lemma_service)
+        cached_model.cache = DecisionCache()
+
+        # the second pass should take its decisions from the cache
+        for _ in range(2):
+            for expected_graph in test_graphs:
+                self.assertEqual(
+                    self._edges(self._parse(cached_model, expected_graph)),
+                    self._edges(self._parse(model, expected_graph)))
+        self.assertGreater(cached_model.cache.hits, 0)
+
+    def test_lazy_model(self):
+        test_graphs = self._fold_model()
+        lemma_service = self.container.lemma_service
+        model = load_model(self.FOLD_MODEL_FOLDER, lemma_service=lemma_service)
+
+        # warming up loads only the members it is given
+        lazy_model = load_model(self.FOLD_MODEL_FOLDER, lazy=True, lemma_service=lemma_service)
+        lazy_model.warm_up([0, 2])
+        self.assertEqual([i for i, loaded in enumerate(lazy_model._loaded) if loaded], [0, 2])
+
+        for expected_graph in test_graphs:
+            self.assertEqual(
+                self._edges(self._parse(lazy_model, expected_graph)),
+                self._edges(self._parse(model, expected_graph)))
+
+        lazy_model.warm_up()
+        self.assertTrue(all(lazy_model._loaded))
+        self.assertEqual(lazy_model.fingerprint, model.fingerprint)
+
+    def test_feature_layout_check(self):
+        lemma_service = self.container.lemma_service
+        with tempfile.TemporaryDirectory() as folder:
+            model_folder = Path(folder)
+            with open(model_folder / ModelFolder.LAYOUT_FILE, 'w') as file:
+                file.write(FeatureLayout.for_lemma_service(lemma_service).to_json())
+            load_model(model_folder, lazy=True, lemma_service=lemma_service)
+
+            # the same lemmas with different ids should be rejected
+            changed_lemma_service = LemmaService()
+            for lemma in reversed(list(lemma_service.lemmas)):
+                changed_lemma_service.add(lemma)
+            with self.assertRaises(ValueError):
+                load_model(model_folder, lazy=True, lemma_service=changed_lemma_service)
+
+            # a model loaded without a lemma service is checked when it is first used
+            model = load_model(model_folder, lazy=True)
+            output_graph = self.container.syntax_service.graphs[0].only_tokens()
+            with self.assertRaisesRegex(ValueError, 'different feature layout'):
+                Parser(model, changed_lemma_service, output_graph).parse()
+
+    def test_morphology_snapshot(self):
+        with tempfile.TemporaryDirectory() as folder:
+            snapshot_file = Path(folder) / 'morphology.snapshot'
+
+            # the first load reads the TSV file and saves the snapshot
+            (tsv_lemma_service, tsv_service) = self._load_morphology(MorphologyService, snapshot_file)
+            self.assertTrue(snapshot_file.exists())
+            (snapshot_lemma_service, snapshot_service) = self._load_morphology(MorphologyService, snapshot_file)
+
+        tokens = self._tokens(tsv_service)
+        self.assertEqual(snapshot_service.token_count, len(tokens))
+        for token in tokens:
+            self.assertEqual(
+                self._segments(snapshot_service, token), self._segments(tsv_service, token), token.location)
+        self.assertEqual(list(snapshot_lemma_service.lemmas.items()), list(tsv_lemma_service.lemmas.items()))
+
+    def test_columnar_morphology(self):
+        with tempfile.TemporaryDirectory() as folder:
+            (tsv_lemma_service, tsv_service) = self._load_morphology(
+                MorphologyService, Path(folder) / 'tsv.snapshot')
+
+            # from the TSV file, then from the snapshot that load saved
+            snapshot_file = Path(folder) / 'columnar.snapshot'
+            columnar_services = [self._load_morphology(ColumnarMorphologyService, snapshot_file) for _ in range(2)]
+
+        tokens = self._tokens(tsv_service)
+        for (lemma_service, columnar_service) in columnar_services:
+            self.assertEqual(columnar_service.token_count, len(tokens))
+            for token in tokens:
+                self.assertEqual(
+                    self._segments(columnar_service, token), self._segments(tsv_service, token), token.location)
+            self.assertEqual(list(lemma_service.lemmas.items()), list(tsv_lemma_service.lemmas.items()))
+
+    # the fold 0 model is trained once per run, and shared by the tests that parse with it
+    def _fold_model(self):
+        (train_graphs, test_graphs) = split_treebank(self.container.syntax_service, 0)
+        if not ParserTest._fold_model_trained:
+            train(self.container.lemma_service, train_graphs, self.FOLD_MODEL_FOLDER)
+            ParserTest._fold_model_trained = True
+        return test_graphs
+
+    def _parse(self, model, expected_graph: SyntaxGraph):
+        output_graph = expected_graph.only_tokens()
+        try:
+            Parser(model, self.container.lemma_service, output_graph).parse()
+        except Exception:
+            pass
+        return output_graph
+
+    def _assert_same_member(self, member: SvmModel | None, expected_member: SvmModel | None):
+        if expected_member is None:
+            self.assertIsNone(member)
+            return
+
+        self.assertEqual(member.action, expected_member.action)
+        if expected_member.model is not None:
+            model = member.model
+            expected_model = expected_member.model
+            self.assertEqual(model.gamma, expected_model.gamma)
+            np.testing.assert_array_equal(model.classes, expected_model.classes)
+            np.testing.assert_array_equal(model._support_vectors, expected_model._support_vectors)
+            np.testing.assert_array_equal(model._dual_coef, expected_model._dual_coef)
+            np.testing.assert_array_equal(model._intercepts, expected_model._intercepts)
+
+    @staticmethod
+    def _load_morphology(service_type: type[MorphologyService], snapshot_file: Path):
+        lemma_service = LemmaService()
+        with mock.patch.object(MorphologyService, 'SNAPSHOT_FILE', snapshot_file):
+            return (lemma_service, service_type(CorpusClient(), lemma_service))
+
+    @staticmethod
+    def _tokens(morphology_service: MorphologyService):
+        return [token for chapter in morphology_service._chapters for verse in chapter.verses for token in verse.tokens]
+
+    @staticmethod
+    def _segments(morphology_service: MorphologyService, token: Token):
+        segments = morphology_service.token(token.location).segments
+        return [(segment.segment_number, segment.features) for segment in segments]
+
+    @staticmethod
+    def _counts(score: EdgeScore):
+        return (score.expected_edges, score.output_edges, score.equivalent_edges)
+
+    def _evaluation_counts(self, evaluation: Evaluation):
+        return (
+            self._counts(evaluation.score),
+            {relation: self._counts(score) for relation, score in evaluation.relations.items()},
+            {part_of_speech: self._counts(score) for part_of_speech, score in evaluation.parts_of_speech.items()})
+
+    @staticmethod
+    def _edges(graph: SyntaxGraph):
+        return [(edge.dependent.index, edge.head.index, edge.relation) for edge in graph.edges]
+
+    def _train_and_test(self, fold: int, store: InstanceStore):
 
         # train
         print(f'Fold {fold}')
         (train_graphs, test_graphs) = split_treebank(self.container.syntax_service, fold)
         lemma_service = self.container.lemma_service
-        train(lemma_service, train_graphs, self.MODEL_FOLDER)
+        train(lemma_service, train_graphs, self.MODEL_FOLDER, workers=os.cpu_count(), store=store)
 
         # test
         print('Evaulating...')
-        model = load_model(self.MODEL_FOLDER)
-        for expected_graph in test_graphs:
-            output_graph = expected_graph.only_tokens()
-            parser = Parser(model, lemma_service, output_graph)
-            try:
-                parser.parse()
-            except Exception as e:
-                print(e)
-            self.elas.compare(expected_graph, output_graph)
-
-        print(f'Running precision: {self.elas.precision}')
-        print(f'Running recall: {self.elas.recall}')
-        print(f'Running F1 score: {self.elas.f1_score}')
+        (output_graphs, errors) = parse_corpus(
+            self.MODEL_FOLDER,
+            lemma_service,
+            [expected_graph.only_tokens() for expected_graph in test_graphs],
+            workers=os.cpu_count())
+
+        for expected_graph, output_graph in zip(test_graphs, output_graphs):
+            self.evaluation.compare(expected_graph, output_graph)
+
+        print(f'Parse errors: {sum(error is not None for error in errors)}')
+
+        print(f'Running precision: {self.evaluation.precision}')
+        print(f'Running recall: {self.evaluation.recall}')
+        print(f'Running F1 score: {self.evaluation.f1_score}')
 
 
 if __name__ == '__main__':